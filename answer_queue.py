@@ -0,0 +1,55 @@
+import threading
+from collections import deque
+
+
+class AnswerQueue:
+    # runs jobs on Anki's background threads strictly in the order they were
+    # submitted, one drain at a time, and hands each result to its callback
+    # back on the main thread. join() blocks until every submitted job has
+    # run, so the main thread can read the state the jobs change
+    def __init__(self, taskman):
+        self.taskman = taskman
+        self.jobs = deque()
+        self.lock = threading.Lock()
+        self.running = False
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def submit(self, job, on_done=None):
+        with self.lock:
+            self.jobs.append((job, on_done))
+            if self.running:
+                return
+            self.running = True
+            self.idle.clear()
+        self.taskman().run_in_background(self.drain, self.on_drained)
+
+    def drain(self):
+        # background thread; keeps going until the queue is empty, so answers
+        # submitted while it runs don't need a thread of their own
+        results = []
+        while True:
+            with self.lock:
+                if not self.jobs:
+                    self.running = False
+                    self.idle.set()
+                    return results
+                job, on_done = self.jobs.popleft()
+            try:
+                results.append((on_done, job(), None))
+            except Exception as error:
+                results.append((on_done, None, error))
+
+    def on_drained(self, future):
+        # main thread
+        error = None
+        for on_done, result, job_error in future.result():
+            if job_error is not None:
+                error = error or job_error
+            elif on_done is not None:
+                on_done(result)
+        if error is not None:
+            raise error
+
+    def join(self):
+        self.idle.wait()
@@ -0,0 +1,182 @@
+import json
+import os
+import struct
+import sys
+
+try:
+    from .sprite_catalog import parse_sprite_name, theme_id
+    from .sprite_bundle import webp_size
+    from .spawn_grid import compile_spawn_grid
+except ImportError:
+    # run directly as the build script
+    from sprite_catalog import parse_sprite_name, theme_id
+    from sprite_bundle import webp_size
+    from spawn_grid import compile_spawn_grid
+
+MANIFEST_FILE_NAME = "asset_manifest.json"
+MANIFEST_VERSION = 1
+
+# image folders whose sizes are recorded, relative to the add-on folder
+ASSET_FOLDERS = ("gardenBackgrounds", "split", "withered", "items")
+
+
+def png_size(data):
+    if data[0:8] != b"\x89PNG\r\n\x1a\n" or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", data[16:24])
+
+
+def tiff_size(data):
+    # width and height tags of the first image directory
+    order = {b"MM": ">", b"II": "<"}.get(data[0:2])
+    if order is None or len(data) < 8:
+        return None
+    offset = struct.unpack(order + "I", data[4:8])[0]
+    if len(data) < offset + 2:
+        return None
+    count = struct.unpack(order + "H", data[offset:offset + 2])[0]
+    found = {}
+    for i in range(count):
+        entry = data[offset + 2 + i * 12:offset + 14 + i * 12]
+        if len(entry) < 12:
+            break
+        tag, kind = struct.unpack(order + "HH", entry[0:4])
+        if tag in (256, 257):
+            # short or long value, stored in the entry itself
+            found[tag] = struct.unpack(order + ("H" if kind == 3 else "I"), entry[8:10] if kind == 3 else entry[8:12])[0]
+    if 256 not in found or 257 not in found:
+        return None
+    return found[256], found[257]
+
+
+def read_size(path):
+    # returns (format, (width, height)). some shipped .webp files are really
+    # PNG or TIFF images, which Qt opens all the same
+    with open(path, "rb") as f:
+        head = f.read(30)
+        size = webp_size(head)
+        if size is not None:
+            return "webp", size
+        size = png_size(head)
+        if size is not None:
+            return "png", size
+        # the directory of an uncompressed TIFF usually follows the pixels
+        f.seek(0)
+        size = tiff_size(f.read())
+        if size is not None:
+            return "tiff", size
+    return None, None
+
+
+def build_manifest(addon_path):
+    # returns the manifest and a list of (severity, message) problems found
+    # while checking the config against the files on disk
+    with open(os.path.join(addon_path, "config.json"), "r") as f:
+        config = json.load(f)
+    problems = []
+
+    sizes = {}
+    for folder in ASSET_FOLDERS:
+        for name in sorted(os.listdir(os.path.join(addon_path, folder))):
+            if not name.endswith(".webp"):
+                continue
+            kind, size = read_size(os.path.join(addon_path, folder, name))
+            if size is None:
+                problems.append(("error", f"{folder}/{name} is not an image the manifest can read"))
+                continue
+            if kind != "webp":
+                problems.append(("warning", f"{folder}/{name} is a {kind.upper()} file"))
+            sizes[f"{folder}/{name}"] = list(size)
+
+    sprites = {}
+    for relpath in sizes:
+        folder, name = relpath.split("/", 1)
+        if folder != "split":
+            continue
+        parsed = parse_sprite_name(name)
+        if parsed is not None:
+            sprites[name] = [parsed[0], parsed[1]]
+
+    themes = {}
+    gardenPositions = config["gardenPositions"]
+    sprite_themes = {theme for species, theme in sprites.values()}
+    for gardenName, gardenPosInfo in gardenPositions.items():
+        background = f"gardenBackgrounds/{gardenName}"
+        grid = compile_spawn_grid(gardenPosInfo)
+        themes[gardenName] = {
+            "theme": theme_id(gardenName),
+            "slots": [list(pos) for pos in grid.positions],
+            "upperRows": sorted(grid.upper_rows),
+        }
+        if background not in sizes:
+            problems.append(("error", f"config theme {gardenName} has no file in gardenBackgrounds"))
+        else:
+            width, height = sizes[background]
+            outside = [pos for pos in grid.positions if not (0 <= pos[0] < width and 0 <= pos[1] < height)]
+            if outside:
+                problems.append(("error", f"{gardenName} has {len(outside)} slots outside its {width}x{height} background"))
+        if not grid.positions:
+            problems.append(("error", f"{gardenName} has no spawn slots"))
+        if theme_id(gardenName) not in sprite_themes:
+            problems.append(("warning", f"{gardenName} has no mushroom sprites in split"))
+    for relpath in sizes:
+        folder, name = relpath.split("/", 1)
+        if folder == "gardenBackgrounds" and name not in gardenPositions:
+            problems.append(("error", f"{relpath} has no entry in config gardenPositions"))
+
+    manifest = {"version": MANIFEST_VERSION, "sizes": sizes, "sprites": sprites, "themes": themes}
+    return manifest, problems
+
+
+def write_manifest(path, manifest):
+    # one entry per line so changes to the assets show up as small diffs
+    compact = json.JSONEncoder(separators=(", ", ": "), sort_keys=True).encode
+    lines = ["{", f'"version": {manifest["version"]},']
+    sections = ["sizes", "sprites", "themes"]
+    for i, section in enumerate(sections):
+        entries = sorted(manifest[section].items())
+        lines.append(f'"{section}": {{')
+        lines += [f"  {json.dumps(key)}: {compact(value)}{',' if j < len(entries) - 1 else ''}" for j, (key, value) in enumerate(entries)]
+        lines.append("}," if i < len(sections) - 1 else "}")
+    lines.append("}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+class AssetManifest:
+    # sizes, species and themes of the shipped images, read from the
+    # checked-in manifest so nothing has to open an image to lay it out
+    def __init__(self, manifest):
+        self.sizes = manifest["sizes"]
+        self.sprites = manifest["sprites"]
+        self.themes = manifest["themes"]
+
+    @classmethod
+    def load(cls, addon_path):
+        try:
+            with open(os.path.join(addon_path, MANIFEST_FILE_NAME), "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(manifest)
+
+    def size(self, relpath):
+        size = self.sizes.get(relpath)
+        return tuple(size) if size else None
+
+    def names(self, folder):
+        prefix = f"{folder}/"
+        return [key[len(prefix):] for key in self.sizes if key.startswith(prefix)]
+
+
+if __name__ == "__main__":
+    addon_path = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__))
+    manifest, problems = build_manifest(addon_path)
+    for severity, message in problems:
+        print(f"{severity}: {message}")
+    write_manifest(os.path.join(addon_path, MANIFEST_FILE_NAME), manifest)
+    print(f"recorded {len(manifest['sizes'])} images and {len(manifest['themes'])} themes")
+    if any(severity == "error" for severity, message in problems):
+        sys.exit(1)
@@ -0,0 +1,399 @@
+import argparse
+import concurrent.futures
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+# measures what the add-on costs per call outside of Anki. aqt is replaced
+# by the stubs below and Qt comes straight from PyQt6, so this needs PyQt6
+# installed but not Anki itself. run from anywhere:
+#
+#     python benchmarks/bench_review_hook.py                  compare to baseline
+#     python benchmarks/bench_review_hook.py --save-baseline  record a new one
+
+ADDON_SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ADDON_MODULE = "nmk_bench_addon"
+ASSET_DIRS = ("gardenBackgrounds", "split", "withered", "items", "sounds", "atlas")
+
+# parameter grid
+FILL_LEVELS = (0.0, 0.5, 1.0)
+COLLECTION_DECKS = (10, 300)
+DECK_DEPTHS = (1, 6)
+COLLECTED_SPECIES = (0, 300, 1300)
+
+# a p50 this much slower than the baseline counts as a regression
+REGRESSION_RATIO = 1.5
+
+
+class Hook(list):
+    pass
+
+
+class StubTaskManager:
+    # runs background tasks inline, or holds them until run_pending() when
+    # deferred, so the reviewer hook can be timed on its own
+    def __init__(self):
+        self.deferred = False
+        self.pending = []
+
+    def run_in_background(self, task, on_done=None):
+        self.pending.append((task, on_done))
+        if not self.deferred:
+            self.run_pending()
+
+    def run_pending(self):
+        while self.pending:
+            task, on_done = self.pending.pop(0)
+            future = concurrent.futures.Future()
+            future.set_result(task())
+            if on_done:
+                on_done(future)
+
+
+# daily review limit of every stub deck
+REVIEW_LIMIT = 200
+
+
+class DeckNode:
+    def __init__(self, deck_id, children, review_count):
+        self.deck_id = deck_id
+        self.children = children
+        self.new_count = 0
+        self.learn_count = 0
+        self.review_count = review_count
+
+
+class StubDecks:
+    # a root deck holding one chain of `depth` nested decks plus filler
+    # decks, so the whole collection has about `decks` decks
+    def __init__(self, decks, depth):
+        self.by_id = {}
+        self.by_name_map = {}
+        self.children = {}
+        name = "Root"
+        chain = []
+        for level in range(depth):
+            deck_id = level + 1
+            self.add(deck_id, name)
+            chain.append(deck_id)
+            name = f"{name}::Level{level + 1}"
+        self.leaf_id = chain[-1]
+        for i in range(max(decks - depth, 0)):
+            self.add(1000 + i, f"Other{i % 20}::Deck{i}")
+
+    def add(self, deck_id, name):
+        deck = {"id": deck_id, "name": name}
+        self.by_id[deck_id] = deck
+        self.by_name_map[name] = deck
+        self.children[deck_id] = []
+        parent = name.rsplit("::", 1)[0]
+        if parent != name:
+            # the parents of filler decks
+            if parent not in self.by_name_map:
+                self.add(-len(self.by_id) - 1, parent)
+            self.children[self.by_name_map[parent]["id"]].append(deck_id)
+
+    def get(self, deck_id):
+        return self.by_id[deck_id]
+
+    def by_name(self, name):
+        return self.by_name_map.get(name)
+
+
+class StubScheduler:
+    # like Anki, builds the due tree for the whole collection and then picks
+    # out the asked-for deck; every deck has one review due, and a node's
+    # count is its subtree's capped at the review limit
+    def __init__(self, decks):
+        self.decks = decks
+
+    def deck_due_tree(self, top_deck_id=None):
+        nodes = {}
+
+        def build(deck_id):
+            children = [build(child) for child in self.decks.children[deck_id]]
+            due = 1 + sum(child.review_count for child in children)
+            nodes[deck_id] = DeckNode(deck_id, children, min(due, REVIEW_LIMIT))
+            return nodes[deck_id]
+
+        tops = [deck_id for deck_id, deck in self.decks.by_id.items() if "::" not in deck["name"]]
+        tree = DeckNode(0, [build(deck_id) for deck_id in tops], 0)
+        if top_deck_id is None:
+            return tree
+        return nodes.get(top_deck_id)
+
+
+def install_stubs(qt_modules, QtWidgets, profile_dir):
+    aqt = types.ModuleType("aqt")
+    aqt_qt = types.ModuleType("aqt.qt")
+    for module in qt_modules:
+        for name in dir(module):
+            if not name.startswith("_"):
+                setattr(aqt_qt, name, getattr(module, name))
+
+    aqt_utils = types.ModuleType("aqt.utils")
+    aqt_utils.showInfo = lambda *args, **kwargs: None
+    aqt_utils.tooltip = lambda *args, **kwargs: None
+    aqt_sound = types.ModuleType("aqt.sound")
+    aqt_sound.play = lambda *args, **kwargs: None
+    gui_hooks = types.ModuleType("aqt.gui_hooks")
+    for name in ("profile_did_open", "profile_will_close", "sync_will_start", "sync_did_finish",
+                 "state_did_change", "reviewer_will_end", "operation_did_execute",
+                 "reviewer_did_show_question", "reviewer_did_show_answer", "reviewer_did_answer_card"):
+        setattr(gui_hooks, name, Hook())
+
+    # the add-on parents dialogs and timers to mw, so it has to be a real window
+    mw = QtWidgets.QMainWindow()
+    mw.form = types.SimpleNamespace(menuTools=QtWidgets.QMenu())
+    mw.addonManager = types.SimpleNamespace(
+        getConfig=lambda name: json.load(open(os.path.join(ADDON_SOURCE, "config.json"))),
+        setConfigUpdatedAction=lambda name, action: None,
+    )
+    mw.pm = types.SimpleNamespace(profileFolder=lambda: profile_dir)
+    mw.col = types.SimpleNamespace()
+    mw.taskman = StubTaskManager()
+    mw.reviewer = object()
+    mw._q_start_time = time.time()
+
+    aqt.mw = mw
+    aqt.qt = aqt_qt
+    aqt.utils = aqt_utils
+    aqt.sound = aqt_sound
+    aqt.gui_hooks = gui_hooks
+    sys.modules.update({
+        "aqt": aqt, "aqt.qt": aqt_qt, "aqt.utils": aqt_utils, "aqt.sound": aqt_sound,
+        "aqt.gui_hooks": gui_hooks,
+    })
+    return mw
+
+
+def copy_addon(target):
+    # the add-on writes its data files next to itself, so run a copy
+    os.makedirs(target)
+    for name in os.listdir(ADDON_SOURCE):
+        path = os.path.join(ADDON_SOURCE, name)
+        if name.endswith((".py", ".json")) and os.path.isfile(path):
+            shutil.copy(path, target)
+        elif name in ASSET_DIRS:
+            os.symlink(path, os.path.join(target, name))
+
+
+def measure(fn, iterations, setup=None):
+    # latency percentiles in microseconds, then peak allocation per call
+    times = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        fn()
+        times.append(time.perf_counter_ns() - start)
+    times.sort()
+
+    alloc_runs = max(1, iterations // 10)
+    peaks = []
+    tracemalloc.start()
+    for _ in range(alloc_runs):
+        if setup:
+            setup()
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    def pct(q):
+        return times[min(len(times) - 1, int(len(times) * q / 100))] / 1000
+
+    return {"p50_us": pct(50), "p90_us": pct(90), "p99_us": pct(99), "alloc_peak_kb": sum(peaks) / len(peaks) / 1024}
+
+
+class Bench:
+    # addon is the loaded garden_app module, hooks the package with the
+    # hook shims Anki calls
+    def __init__(self, addon, hooks, mw, iterations):
+        self.addon = addon
+        self.hooks = hooks
+        self.mw = mw
+        self.iterations = iterations
+        self.rng = random.Random(1)
+        self.card = types.SimpleNamespace(did=None, odid=0)
+        # the garden popup and reward dialogs would block on exec()
+        addon.show_shroomgarden = lambda: None
+        addon.showInfo = lambda *args, **kwargs: None
+
+    def set_collection(self, decks, depth):
+        deck_store = StubDecks(decks, depth)
+        self.mw.col.decks = deck_store
+        self.mw.col.sched = StubScheduler(deck_store)
+        self.card.did = deck_store.leaf_id
+        self.addon.invalidate_root_decks()
+        self.addon.invalidate_deck_completion()
+
+    def set_garden(self, fill, collected):
+        state = self.addon.state
+        state.ensure_loaded()
+        gardenName = "10002_Grassy_Green.webp"
+        grid = self.addon.spawnGrids.grid(gardenName)
+        sprites = self.addon.catalog.theme_shrooms("10002")
+        nmks = {}
+        for x, y in grid.positions[:int(len(grid.positions) * fill)]:
+            nmks[f"{x}_{y}"] = {"nmk": self.rng.choice(sprites), "x": x, "y": y, "stage": 1}
+        state.garden.update({"gardenName": gardenName, "gardenNMKs": nmks, "cardCount": 0, "easyCount": 0, "shield": 0, "booster": 0})
+        names = sorted(self.addon.catalog.info)[:collected]
+        state.user["collectedMushrooms"] = {name: 1 for name in names}
+        state.free_slots = None
+        state.collection = None
+        # changed without apply(), so bump the version by hand
+        state.version += 1
+
+    def answer(self):
+        self.mw._q_start_time = time.time() - 5
+        self.hooks.on_answer_card(None, self.card, 3)
+
+    def run(self):
+        results = {}
+        for fill in FILL_LEVELS:
+            for decks in COLLECTION_DECKS:
+                for depth in DECK_DEPTHS:
+                    self.set_collection(decks, depth)
+                    self.set_garden(fill, 0)
+                    snapshot = json.dumps(self.addon.state.garden)
+
+                    def reset():
+                        self.addon.state.garden.update(json.loads(snapshot))
+                        self.addon.state.free_slots = None
+                    results[f"on_answer_card fill={fill} decks={decks} depth={depth}"] = measure(self.answer, self.iterations, reset)
+
+            # what the reviewer waits for; the garden update runs afterwards
+            self.mw.taskman.deferred = True
+            results[f"reviewer hook fill={fill}"] = measure(self.answer, self.iterations, self.mw.taskman.run_pending)
+            self.mw.taskman.deferred = False
+            self.mw.taskman.run_pending()
+
+            self.set_garden(fill, 0)
+            # the free-slot set an answer rebuilds after a theme change, and
+            # a spawn from it on a copy of the garden
+            state = self.addon.state
+            grid = self.addon.spawnGrids.grid(state.garden["gardenName"])
+            occupied = [(v["x"], v["y"]) for v in state.garden["gardenNMKs"].values()]
+            FreeSlots = importlib.import_module(ADDON_MODULE + ".spawn_grid").FreeSlots
+            results[f"FreeSlots fill={fill}"] = measure(lambda: FreeSlots(grid, occupied), self.iterations)
+            model = importlib.import_module(ADDON_MODULE + ".garden_rules").GardenModel()
+
+            def new_model():
+                model.garden = dict(state.garden, gardenNMKs=dict(state.garden["gardenNMKs"]))
+                model.user = state.user
+                model.free_slots = None
+                model.free_slots_for(grid)
+            results[f"GardenRules.spawn fill={fill}"] = measure(lambda: self.addon.rules.spawn(model), self.iterations, new_model)
+
+            dialog = self.addon.build_shroomgarden()
+            results[f"load_nmks fill={fill}"] = measure(dialog.load_nmks, self.iterations)
+            dialog.deleteLater()
+
+            # opening the garden once the answer queue has drawn it
+            self.addon.refresh_snapshot()
+            results[f"build_shroomgarden fill={fill}"] = measure(
+                self.addon.build_shroomgarden, max(1, self.iterations // 10))
+
+        for collected in COLLECTED_SPECIES:
+            self.set_garden(0.5, collected)
+
+            def build_menu():
+                self.addon.MenuWindow(None).deleteLater()
+            results[f"MenuWindow collected={collected}"] = measure(build_menu, max(1, self.iterations // 10))
+
+            # showing the kept menu again
+            menu = self.addon.MenuWindow(None)
+            results[f"MenuWindow reload collected={collected}"] = measure(menu.reload, max(1, self.iterations // 10))
+            menu.deleteLater()
+        return results
+
+
+def memory_report(addon, hooks, QtWidgets):
+    # what the add-on holds on to after the whole run; widget counts and
+    # cache sizes should stay flat however many answers were timed
+    dialogs = [dialog for dialog in (addon.gardenDialog, addon.menuDialog) if dialog is not None]
+    widgets = sum(len(dialog.findChildren(QtWidgets.QWidget)) + 1 for dialog in dialogs)
+    cache = addon.pixmaps.stats()
+    composite = addon.snapshot.stats()
+    return "\n".join([
+        f"Widgets: {len(QtWidgets.QApplication.allWidgets())} in all, {widgets} in {len(dialogs)} Shroomgarden dialog(s)",
+        f"Pixmap cache: {cache['entries']} images, {cache['bytes'] / 2**20:.1f} MB, {cache['hits']} hits, {cache['misses']} misses",
+        f"Garden snapshot: {composite['sprites']} sprites, {composite['bytes'] / 2**20:.1f} MB",
+        f"Images being decoded: {len(addon.imageLoader.pending)}",
+        "Startup: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in hooks.startupTimes.items()),
+    ])
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:60s} p50 {result['p50_us']:9.1f}us (no baseline)")
+            continue
+        ratio = result["p50_us"] / max(base["p50_us"], 0.001)
+        flag = " REGRESSION" if ratio > REGRESSION_RATIO else ""
+        print(f"{name:60s} p50 {result['p50_us']:9.1f}us  baseline {base['p50_us']:9.1f}us  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the add-on's review hook and dialogs against stubbed Anki.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="also write the raw results to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6 import QtCore, QtGui, QtWidgets
+    except ImportError:
+        sys.exit("the benchmark needs PyQt6")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    workdir = tempfile.mkdtemp(prefix="nmk_bench_")
+    mw = install_stubs((QtCore, QtGui, QtWidgets), QtWidgets, workdir)
+    try:
+        copy_addon(os.path.join(workdir, ADDON_MODULE))
+        sys.path.insert(0, workdir)
+        hooks = importlib.import_module(ADDON_MODULE)
+        results = Bench(hooks.app(), hooks, mw, args.iterations).run()
+        # no event loop runs here, so carry out the deleteLater() calls
+        QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.Type.DeferredDelete)
+        print(memory_report(hooks.app(), hooks, QtWidgets))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved {len(results)} baselines to {BASELINE_FILE}")
+        return
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline)
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s)")
+
+
+if __name__ == "__main__":
+    main()
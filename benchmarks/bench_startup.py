@@ -0,0 +1,93 @@
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import types
+
+# what the add-on adds to Anki's launch. every run is a fresh interpreter,
+# so module caches can't hide import cost. uses the same stubs as
+# bench_review_hook.py:
+#
+#     python benchmarks/bench_startup.py                  compare to baseline
+#     python benchmarks/bench_startup.py --save-baseline  record a new one
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_review_hook import install_stubs, copy_addon, ADDON_MODULE, REGRESSION_RATIO
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+
+def child(workdir, profile_dir):
+    # one launch: import the add-on the way Anki does, then let the deferred
+    # profile-open work run. prints the add-on's own startupTimes
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6 import QtCore, QtGui, QtWidgets
+    app = QtWidgets.QApplication([])
+    mw = install_stubs((QtCore, QtGui, QtWidgets), QtWidgets, profile_dir)
+    mw.col.db = types.SimpleNamespace(scalar=lambda *args: 0, list=lambda *args: [], all=lambda *args: [])
+    sys.path.insert(0, workdir)
+    addon = importlib.import_module(ADDON_MODULE)
+    addon.on_profile_open()
+    addon.loaded_app()
+    addon.on_profile_close()
+    print(json.dumps(addon.startupTimes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the add-on's share of Anki startup against stubbed Anki.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="nmk_startup_")
+    try:
+        copy_addon(os.path.join(workdir, ADDON_MODULE))
+        runs = []
+        for i in range(args.runs):
+            # a new profile each time, like a first launch after installing
+            profile_dir = os.path.join(workdir, f"profile{i}")
+            os.makedirs(profile_dir)
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", workdir, profile_dir],
+                                    check=True, capture_output=True, text=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    results = {name: {"p50_ms": statistics.median(run[name] for run in runs)} for name in runs[0]}
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved {len(results)} baselines to {BASELINE_FILE}")
+        return
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:30s} p50 {result['p50_ms']:8.2f}ms (no baseline)")
+            continue
+        ratio = result["p50_ms"] / max(base["p50_ms"], 0.001)
+        flag = " REGRESSION" if ratio > REGRESSION_RATIO else ""
+        print(f"{name:30s} p50 {result['p50_ms']:8.2f}ms  baseline {base['p50_ms']:8.2f}ms  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s)")
+
+
+if __name__ == "__main__":
+    main()
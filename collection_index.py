@@ -0,0 +1,28 @@
+class CollectionIndex:
+    # distinct collected species per theme, counted once from the user's
+    # collection and then bumped only when a harvest adds a new species,
+    # so theme progress and completion checks don't scan anything
+    def __init__(self, catalog, collected):
+        self.catalog = catalog
+        self.collected = {}
+        for name, count in collected.items():
+            if count > 0:
+                self.add(name)
+
+    def add(self, name):
+        theme = self.catalog.theme_of(name)
+        if theme is not None:
+            self.collected[theme] = self.collected.get(theme, 0) + 1
+
+    def collected_count(self, theme):
+        return self.collected.get(theme, 0)
+
+    def total_count(self, theme):
+        return len(self.catalog.theme_sets.get(theme, ()))
+
+    def complete(self, theme):
+        return self.collected_count(theme) >= self.total_count(theme)
+
+    def progress(self, themes):
+        # (theme, collected, total) for each theme id
+        return [(theme, self.collected_count(theme), self.total_count(theme)) for theme in themes]
@@ -3,32 +3,63 @@ from aqt.qt import *
 
 import time
 
+# answers between two real completion checks of a root deck that was
+# found done; one that wasn't is checked again on every answer
+COMPLETION_CHECK_INTERVAL = 10
+
+# root deck id -> [is done, answers served from this entry]
+completionCache = {}
+
+# deck id -> root deck id, filled lazily and dropped on any deck change
+rootDeckCache = {}
+
 
 def get_root_deck_id(deck_id):
-    deck = mw.col.decks.get(deck_id)
-    while "::" in deck["name"]:
-        parent_name = deck["name"].rsplit("::", 1)[0]
-        deck = mw.col.decks.by_name(parent_name)
-    return deck["id"]
+    root_id = rootDeckCache.get(deck_id)
+    if root_id is None:
+        deck = mw.col.decks.get(deck_id)
+        root_name = deck["name"].split("::", 1)[0]
+        if root_name != deck["name"]:
+            deck = mw.col.decks.by_name(root_name)
+        root_id = deck["id"]
+        rootDeckCache[deck_id] = root_id
+    return root_id
 
-def deck_tree_is_done(root_deck_id: int) -> bool:
-    root = mw.col.sched.deck_due_tree()
+def invalidate_root_decks(*args):
+    rootDeckCache.clear()
 
-    def walk(node):
-        if node.deck_id == root_deck_id:
-            return subtree_is_done(node)
-        for child in node.children:
-            result = walk(child)
-            if result is not None:
-                return result
-        return None
+def deck_tree_is_done(root_deck_id: int) -> bool:
+    # the root's node carries what the scheduler would show for the whole
+    # deck: its subdecks' cards, capped by their own limits and the root's
+    root = mw.col.sched.deck_due_tree(root_deck_id)
+    if root is None:
+        return False
+    return root.new_count + root.learn_count + root.review_count == 0
 
-    def subtree_is_done(node):
-        if node.new_count + node.learn_count + node.review_count > 0:
-            return False
-        return all(subtree_is_done(child) for child in node.children)
+def cached_deck_tree_is_done(root_deck_id: int) -> bool:
+    # a deck that isn't done yet is checked on every answer so the answer
+    # that finishes it is seen straight away; a done deck stays done until
+    # something reschedules cards, so that result is reused for a while
+    entry = completionCache.get(root_deck_id)
+    if entry is None or not entry[0] or entry[1] >= COMPLETION_CHECK_INTERVAL:
+        entry = [deck_tree_is_done(root_deck_id), 0]
+        completionCache[root_deck_id] = entry
+    entry[1] += 1
+    return entry[0]
 
-    result = walk(root)
-    return bool(result)
+def invalidate_deck_completion(*args):
+    completionCache.clear()
 
+def on_operation_did_execute(changes, handler):
+    # adding, renaming, reparenting or deleting decks can change any root
+    if changes.deck:
+        invalidate_root_decks()
+        invalidate_deck_completion()
 
+    # the reviewer's own answers are rechecked by cached_deck_tree_is_done,
+    # anything else touching cards or queues (undo, browser edits, ...)
+    # forces a recheck
+    if handler is mw.reviewer:
+        return
+    if changes.card or changes.study_queues:
+        invalidate_deck_completion()
@@ -0,0 +1,708 @@
+from aqt import mw
+from aqt.utils import showInfo, tooltip
+from aqt.qt import *
+
+import os
+import time
+from aqt.sound import play
+from .deck_helper_functions import get_root_deck_id, cached_deck_tree_is_done, invalidate_deck_completion, invalidate_root_decks, on_operation_did_execute
+from .garden_state import GardenState, DEFAULT_GARDEN
+from .garden_rules import GardenRules
+from .rarity_sampler import RaritySampler
+from .garden_settings import Settings
+from .revlog_catchup import RevlogCatchup
+from .answer_queue import AnswerQueue
+from .garden_sounds import SoundBoard
+from .sprite_catalog import SpriteCatalog, SPROUT, theme_id
+from .spawn_grid import SpawnGridCache
+from .pixmap_cache import PixmapCache
+from .garden_canvas import GardenCanvas
+from .garden_snapshot import GardenSnapshot
+from .sprite_bundle import SpriteBundles
+from .asset_manifest import AssetManifest
+from .image_loader import ImageLoader
+from .mushroom_index import MushroomIndexModel, MushroomIndexFilter, NameRole, ThemeRole, RarityRole, CountRole
+
+ADDON_PATH = os.path.dirname(__file__)
+BACKGROUND_DIR = os.path.join(ADDON_PATH, "gardenBackgrounds")
+NMK_DIR = os.path.join(ADDON_PATH, "split")
+WITHERED_DIR = os.path.join(ADDON_PATH, "withered")
+SOUNDS_DIR = os.path.join(ADDON_PATH, "sounds")
+ITEMS_DIR = os.path.join(ADDON_PATH, "items")
+
+CURRENT_GARDEN_FILE = os.path.join(ADDON_PATH, "currentGarden.json")
+USER_DATA_FILE = os.path.join(ADDON_PATH, "userData.json")
+SETTINGS_FILE = os.path.join(ADDON_PATH, "settings.json")
+# garden, collection and inventory, kept per profile so add-on updates
+# don't replace them
+GARDEN_DB_NAME = "shroomgarden.db"
+
+# scale factors for the different places sprites and backgrounds are shown
+SPRITE_SCALE = 0.75
+THUMBNAIL_SCALE = 0.75
+ITEM_SCALE = 0.5
+PREVIEW_SCALE = 0.25
+
+# cell size of the Mushroom Index grid, fits a 0.75x sprite and its count
+INDEX_GRID_SIZE = (110, 120)
+
+# flush dirty garden state after this long without another change
+IDLE_FLUSH_MS = 10 * 1000
+
+# packed sprite bundles built by sprite_bundle.py, loose files otherwise
+bundles = SpriteBundles.load(ADDON_PATH)
+# image sizes and sprite names recorded by asset_manifest.py
+manifest = AssetManifest.load(ADDON_PATH)
+if bundles is not None:
+    catalog = SpriteCatalog(bundles.names("split"))
+elif manifest is not None:
+    catalog = SpriteCatalog(manifest.names("split"))
+else:
+    catalog = SpriteCatalog.from_dir(NMK_DIR)
+
+state = GardenState(lambda: os.path.join(mw.pm.profileFolder(), GARDEN_DB_NAME), CURRENT_GARDEN_FILE, USER_DATA_FILE)
+gardenSettings = Settings(SETTINGS_FILE)
+spawnGrids = SpawnGridCache(lambda: get_config())
+sampler = RaritySampler(catalog, lambda: get_config().get("rarity"))
+rules = GardenRules(catalog, spawnGrids, sampler=sampler)
+catchup = RevlogCatchup(state, rules, get_root_deck_id)
+answerQueue = AnswerQueue(lambda: mw.taskman)
+sounds = SoundBoard({
+    "sprout": os.path.join(SOUNDS_DIR, "NEO_SE_cry_child.ogg"),
+    "harvest": os.path.join(SOUNDS_DIR, "NEO_SE_cry_normal.ogg"),
+    "fall": os.path.join(SOUNDS_DIR, "NEO_SE_nmk_fall.ogg"),
+}, play, mw)
+
+def bundle_path(path):
+    return os.path.relpath(path, ADDON_PATH).replace(os.sep, "/")
+
+def load_pixmap(path):
+    if bundles is not None:
+        data = bundles.read(bundle_path(path))
+        if data is not None:
+            pixmap = QPixmap()
+            if pixmap.loadFromData(data, "WEBP"):
+                return pixmap
+    return QPixmap(path)
+
+def load_image(path):
+    # safe to call from decoder threads, unlike load_pixmap
+    if bundles is not None:
+        data = bundles.read(bundle_path(path))
+        if data is not None:
+            image = QImage()
+            if image.loadFromData(data, "WEBP"):
+                return image
+    return QImageReader(path).read()
+
+def image_size(path, scale=1.0):
+    # read from the manifest, the bundle index or the file header, without
+    # decoding
+    size = manifest.size(bundle_path(path)) if manifest is not None else None
+    if size is None and bundles is not None:
+        size = bundles.size(bundle_path(path))
+    if size is None:
+        qsize = QImageReader(path).size()
+        size = (qsize.width(), qsize.height())
+    return int(size[0] * scale), int(size[1] * scale)
+
+pixmaps = PixmapCache(loader=load_pixmap)
+imageLoader = ImageLoader(pixmaps, load_image, mw)
+snapshot = GardenSnapshot(load_image, lambda gardenName: background_key(gardenName), lambda nmkName: nmk_key(nmkName))
+idleFlushTimer = None
+prefetchedTheme = None
+# the garden and menu dialogs, built on first show and reused
+gardenDialog = None
+menuDialog = None
+
+def get_config():
+    return mw.addonManager.getConfig(__name__)
+
+class Shroomgarden(QDialog):
+    # built once per profile and hidden when closed; reload() points it at
+    # the current garden before each show
+    def __init__(self, parent=None):
+        super(Shroomgarden, self).__init__(parent)
+        self.setWindowTitle("Shroomgarden")
+        layout = QVBoxLayout()
+        self.canvas = GardenCanvas(self)
+        self.canvas.nmkClicked.connect(self.on_nmk_clicked)
+        self.canvas.nmksSelected.connect(self.on_nmks_selected)
+        self.harvestAllButton = QPushButton("Harvest All")
+        self.harvestAllButton.clicked.connect(self.harvest_all)
+        layout.addWidget(self.canvas)
+        layout.addWidget(self.harvestAllButton)
+        self.setLayout(layout)
+        imageLoader.pixmapReady.connect(self.on_pixmap_ready)
+
+    def reload(self):
+        answerQueue.join()
+        state.ensure_loaded()
+        key = background_key(state.garden["gardenName"])
+        w, h = image_size(*key)
+        self.canvas.set_background(key, imageLoader.request(*key), (w, h))
+        self.setFixedSize(w + 20, h + 50 + self.harvestAllButton.sizeHint().height())
+        self.load_nmks()
+        # the garden as one image, when the answer queue has already drawn it
+        self.canvas.set_composite(snapshot.pixmap_for(state, state.deck))
+
+    def load_nmks(self):
+        garden_data = state.garden
+        nmks = []
+        for coordsStr, nmk_data in garden_data["gardenNMKs"].items():
+            key = nmk_key(nmk_data["nmk"])
+            nmks.append((coordsStr, key, imageLoader.request(*key), image_size(*key), nmk_data["x"], nmk_data["y"]))
+        self.canvas.set_nmks(nmks)
+
+    def on_pixmap_ready(self, path, scale):
+        key = (path, scale)
+        self.canvas.pixmap_ready(key, pixmaps.peek(*key))
+
+    def on_nmk_clicked(self, coordsStr):
+        if harvest_nmk(coordsStr):
+            self.canvas.remove_nmk(coordsStr)
+
+    def on_nmks_selected(self, coordsStrs):
+        self.canvas.remove_nmks(harvest_nmks(coordsStrs))
+
+    def harvest_all(self):
+        # the answer queue may still be changing the garden
+        answerQueue.join()
+        self.canvas.remove_nmks(harvest_nmks(list(state.garden["gardenNMKs"])))
+
+    def test_click(self):
+        test_card_review()
+        self.load_nmks()
+        
+
+    def refresh(self):
+        self.repaint()
+        self.update()
+
+class MenuWindow(QDialog):
+    def __init__(self, parent=None):
+        super(MenuWindow, self).__init__(parent)
+        self.setWindowTitle("Shroomgarden Menu")
+        self.canvas = None
+        self.resize(400, 300)
+        self.layout = QVBoxLayout()
+        self.tabs = QTabWidget()
+        self.layout.addWidget(self.tabs)
+        answerQueue.join()
+        state.ensure_loaded()
+        self.user_data = state.user
+
+        self.create_index()
+        self.create_progress()
+        self.create_inventory()
+        self.create_settings()
+
+        self.setLayout(self.layout)
+
+    def reload(self):
+        # the menu is kept between shows; bring every tab up to date
+        answerQueue.join()
+        state.ensure_loaded()
+        self.user_data = state.user
+        self.indexModel.set_collected(self.user_data["collectedMushrooms"])
+        self.fill_rarity_filter()
+        self.sort_index(self.sortBox.currentIndex())
+        if self.tabs.currentWidget() is self.progressWidget:
+            self.fill_progress()
+        self.show_inventory()
+        self.show_settings()
+        
+    def create_index(self):
+        indexWidget = QWidget()
+        layout = QVBoxLayout(indexWidget)
+
+        self.indexModel = MushroomIndexModel(self.user_data["collectedMushrooms"], catalog, sampler, imageLoader,
+                                             lambda nmkName: (os.path.join(NMK_DIR, nmkName), THUMBNAIL_SCALE), self)
+        self.indexFilter = MushroomIndexFilter(self)
+        self.indexFilter.setSourceModel(self.indexModel)
+
+        self.indexActionsBar = QHBoxLayout()
+        self.themeFilterBox = QComboBox()
+        self.themeFilterBox.addItem("All themes", None)
+        for theme in spawnGrids.theme_names():
+            self.themeFilterBox.addItem(theme, theme_id(theme))
+        self.themeFilterBox.currentIndexChanged.connect(lambda i: self.indexFilter.set_theme(self.themeFilterBox.itemData(i)))
+
+        self.rarityFilterBox = QComboBox()
+        self.fill_rarity_filter()
+        self.rarityFilterBox.currentIndexChanged.connect(lambda i: self.indexFilter.set_rarity(self.rarityFilterBox.itemData(i)))
+
+        self.sortBox = QComboBox()
+        self.sortBox.addItem("Sort by count", (CountRole, Qt.SortOrder.DescendingOrder))
+        self.sortBox.addItem("Sort by theme", (ThemeRole, Qt.SortOrder.AscendingOrder))
+        self.sortBox.addItem("Sort by rarity", (RarityRole, Qt.SortOrder.AscendingOrder))
+        self.sortBox.addItem("Sort by name", (NameRole, Qt.SortOrder.AscendingOrder))
+        self.sortBox.currentIndexChanged.connect(self.sort_index)
+
+        self.indexActionsBar.addWidget(self.themeFilterBox)
+        self.indexActionsBar.addWidget(self.rarityFilterBox)
+        self.indexActionsBar.addWidget(self.sortBox)
+        layout.addLayout(self.indexActionsBar)
+
+        # uniform item sizes keep the view from touching rows it isn't showing
+        self.indexView = QListView()
+        self.indexView.setViewMode(QListView.ViewMode.IconMode)
+        self.indexView.setResizeMode(QListView.ResizeMode.Adjust)
+        self.indexView.setMovement(QListView.Movement.Static)
+        self.indexView.setUniformItemSizes(True)
+        self.indexView.setLayoutMode(QListView.LayoutMode.Batched)
+        self.indexView.setGridSize(QSize(*INDEX_GRID_SIZE))
+        self.indexView.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.indexView.setModel(self.indexFilter)
+        layout.addWidget(self.indexView)
+        self.sort_index(0)
+
+        self.tabs.addTab(indexWidget, "Index")
+
+    def fill_rarity_filter(self):
+        # the tiers come from the rarity config, which can change between shows
+        selected = self.rarityFilterBox.currentData()
+        self.rarityFilterBox.blockSignals(True)
+        self.rarityFilterBox.clear()
+        self.rarityFilterBox.addItem("All rarities", None)
+        for rarity in sampler.tiers():
+            self.rarityFilterBox.addItem(rarity[0].upper() + rarity[1:], rarity)
+        self.rarityFilterBox.setCurrentIndex(max(0, self.rarityFilterBox.findData(selected)))
+        self.rarityFilterBox.blockSignals(False)
+        self.indexFilter.set_rarity(self.rarityFilterBox.currentData())
+
+    def sort_index(self, i):
+        role, order = self.sortBox.itemData(i)
+        self.indexModel.sort_by(role, order)
+
+    def create_progress(self):
+        progressWidget = QWidget()
+        self.progressWidget = progressWidget
+        layout = QVBoxLayout(progressWidget)
+        self.progressTable = QTableWidget(0, 2)
+        self.progressTable.setHorizontalHeaderLabels(["Theme", "Collected"])
+        self.progressTable.verticalHeader().setVisible(False)
+        self.progressTable.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.progressTable.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.progressTable)
+        self.progressBars = []
+
+        # the rows are only built once the tab is opened, and only their
+        # values change after that
+        self.tabs.addTab(progressWidget, "Progress")
+        self.tabs.currentChanged.connect(lambda i: self.tabs.widget(i) is progressWidget and self.fill_progress())
+
+    def fill_progress(self):
+        themes = spawnGrids.theme_names()
+        progress = state.collection_for(catalog).progress([theme_id(theme) for theme in themes])
+        if len(self.progressBars) != len(themes):
+            # first show, or the config changed the number of themes
+            self.progressTable.setRowCount(len(themes))
+            self.progressBars = []
+            for row in range(len(themes)):
+                self.progressTable.setItem(row, 0, QTableWidgetItem())
+                bar = QProgressBar()
+                self.progressTable.setCellWidget(row, 1, bar)
+                self.progressBars.append(bar)
+        for row, (theme, bar, (_, collected, total)) in enumerate(zip(themes, self.progressBars, progress)):
+            self.progressTable.item(row, 0).setText(theme.rsplit(".", 1)[0])
+            bar.setRange(0, max(total, 1))
+            bar.setValue(collected)
+            bar.setFormat(f"{collected}/{total}")
+
+    def create_inventory(self):
+        inventoryWidget = QWidget()
+        layout = QFormLayout(inventoryWidget)
+        shieldRow = QHBoxLayout()
+        boosterRow = QHBoxLayout()
+        layout.addRow(QLabel("Inventory Items:"))
+        
+        self.shieldLabel = QLabel()
+        self.shieldLabel.setPixmap(pixmaps.get(os.path.join(ITEMS_DIR, "shield.webp"), ITEM_SCALE))
+        self.shieldCount = QLabel()
+
+        self.boosterLabel = QLabel()   
+        self.boosterLabel.setPixmap(pixmaps.get(os.path.join(ITEMS_DIR, "booster.webp"), ITEM_SCALE))
+        self.boosterCount = QLabel()
+        self.show_inventory()
+
+        def use_item(item):
+            answerQueue.join()
+            if rules.use_item(state, item):
+                self.show_inventory()
+                commit_state()
+
+                showInfo(f"Used one {item}.")
+                
+            else:
+                showInfo(f"No {item} left in inventory.")
+
+        useShieldButton = QPushButton("Use Shield")
+        useShieldButton.clicked.connect(lambda: use_item("shield"))
+        shieldRow.addWidget(self.shieldLabel)
+        shieldRow.addWidget(self.shieldCount)
+        shieldRow.addWidget(useShieldButton)
+
+        useBoosterButton = QPushButton("Use Booster")
+        useBoosterButton.clicked.connect(lambda: use_item("booster"))
+        boosterRow.addWidget(self.boosterLabel)
+        boosterRow.addWidget(self.boosterCount)
+        boosterRow.addWidget(useBoosterButton)
+        layout.addRow(shieldRow)
+        layout.addRow(boosterRow)
+
+        self.tabs.addTab(inventoryWidget, "Inventory")
+
+    def show_inventory(self):
+        self.shieldCount.setText(str(self.user_data["inventory"].get("shield", 0)))
+        self.boosterCount.setText(str(self.user_data["inventory"].get("booster", 0)))
+
+    def create_settings(self):
+        settingsWidget = QWidget()
+        rootLayout = QVBoxLayout(settingsWidget)
+        themesLayout = QHBoxLayout()
+        rootLayout.addLayout(themesLayout)
+
+        leftLayout = QFormLayout()
+        themesLayout.addLayout(leftLayout)
+        self.selectThemeMenu = QMenu()
+        
+        themes = spawnGrids.theme_names()
+        for theme in themes:
+            action = QAction(theme, self.selectThemeMenu)
+            self.selectThemeMenu.addAction(action)
+
+        leftLayout.addRow(QLabel("Select Garden Theme:"))
+        self.selectThemeButton = QPushButton("Select Theme")
+        self.selectThemeButton.setMenu(self.selectThemeMenu)
+        leftLayout.addRow(self.selectThemeButton)
+        
+        rightLayout = QVBoxLayout()
+        themesLayout.addLayout(rightLayout)
+        imageLabel = QLabel()
+        imageLabel.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
+        rightLayout.addWidget(imageLabel)
+        collectedCount = QLabel()
+        rightLayout.addWidget(collectedCount)
+
+        rightLayout.addStretch()
+
+
+        def on_menu_hovered(self, action):
+            theme = action.text()
+            
+            imageLabel.setPixmap(pixmaps.get(os.path.join(BACKGROUND_DIR, theme), PREVIEW_SCALE))
+            
+            collectedCount.setText(collected_count_text(theme))
+            
+        def collected_count_text(theme):
+            collection = state.collection_for(catalog)
+            return f"Collected {collection.collected_count(theme_id(theme))}/{collection.total_count(theme_id(theme))}."
+
+        def on_menu_about_to_hide():
+            imageLabel.clear() 
+            collectedCount.clear()
+            
+        def on_triggered(action):
+            theme = action.text()
+            # update current garden
+            answerQueue.join()
+            state.apply({"type": "set", "field": "gardenName", "value": theme})
+            commit_state()
+
+            imageLabel.setPixmap(pixmaps.get(os.path.join(BACKGROUND_DIR, theme), PREVIEW_SCALE))
+            
+            collectedCount.setText(collected_count_text(theme))
+            showInfo(f"Garden theme changed to {theme}.")
+
+        self.selectThemeMenu.hovered.connect(lambda action: on_menu_hovered(self, action))
+        self.selectThemeMenu.aboutToHide.connect(on_menu_about_to_hide)
+        self.selectThemeMenu.triggered.connect(on_triggered)
+
+        # add the settings options
+        settingsLayout = QVBoxLayout()
+        rootLayout.addLayout(settingsLayout)
+
+        reviewsPerNMKSpin = QSpinBox()
+        reviewsPerNMKSpin.setMinimum(2)
+        settingsLayout.addWidget(QLabel("Reviews per Mushroom Growth:"))
+        settingsLayout.addWidget(reviewsPerNMKSpin)
+
+        gardenShowIntervalSpin = QSpinBox()
+        gardenShowIntervalSpin.setMinimum(30)
+        settingsLayout.addWidget(QLabel("Cards between Garden Shows:"))
+        settingsLayout.addWidget(gardenShowIntervalSpin)
+
+        commonChanceSpin = QDoubleSpinBox()
+        commonChanceSpin.setMinimum(0.6)
+        commonChanceSpin.setMaximum(1.0)
+        commonChanceSpin.setSingleStep(0.1)
+        settingsLayout.addWidget(QLabel("Common Mushroom Chance:"))
+        settingsLayout.addWidget(commonChanceSpin)
+
+        shieldRatioSpin = QDoubleSpinBox()
+        shieldRatioSpin.setMinimum(0.0)
+        shieldRatioSpin.setMaximum(1.0)
+        shieldRatioSpin.setSingleStep(0.1)
+        settingsLayout.addWidget(QLabel("Shield vs Booster Ratio:"))
+        settingsLayout.addWidget(shieldRatioSpin)
+
+        rewardsThresholdSpin = QSpinBox()
+        rewardsThresholdSpin.setMinimum(20)
+        settingsLayout.addWidget(QLabel("Rewards Threshold:"))
+        settingsLayout.addWidget(rewardsThresholdSpin)
+
+        saveSettingsButton = QPushButton("Save Settings")
+        def save_settings_click():
+            new_settings = {
+                "reviewsPerNMK": reviewsPerNMKSpin.value(),
+                "gardenShowInterval": gardenShowIntervalSpin.value(),
+                "common_chance": commonChanceSpin.value(),
+                "shieldRatio": shieldRatioSpin.value(),
+                "rewardsThreshold": rewardsThresholdSpin.value()
+            }
+            gardenSettings.save(new_settings)
+            showInfo("Settings saved.")
+
+        saveSettingsButton.clicked.connect(save_settings_click)
+        settingsLayout.addWidget(saveSettingsButton)
+
+        def show_settings():
+            settings = gardenSettings.get()
+            reviewsPerNMKSpin.setValue(settings["reviewsPerNMK"])
+            gardenShowIntervalSpin.setValue(settings["gardenShowInterval"])
+            commonChanceSpin.setValue(settings["common_chance"])
+            shieldRatioSpin.setValue(settings["shieldRatio"])
+            rewardsThresholdSpin.setValue(settings["rewardsThreshold"])
+        self.show_settings = show_settings
+        show_settings()
+
+        self.tabs.addTab(settingsWidget, "Settings")
+
+def background_key(gardenName):
+    return os.path.join(BACKGROUND_DIR, gardenName), 1.0
+
+def nmk_key(nmkName):
+    # scale down non-fully grown mushrooms
+    scale = SPRITE_SCALE if nmkName != SPROUT else 1.0
+    return os.path.join(NMK_DIR, nmkName), scale
+
+def prefetch_theme(garden):
+    # decode a garden's theme sprites in the background so the garden popup
+    # doesn't have to
+    global prefetchedTheme
+    gardenName = garden["gardenName"]
+    if prefetchedTheme == gardenName:
+        return
+    prefetchedTheme = gardenName
+    requests = [background_key(gardenName), nmk_key(SPROUT)]
+    requests += [nmk_key(nmkName) for nmkName in catalog.theme_shrooms(theme_id(gardenName))]
+    requests += [nmk_key(nmk_data["nmk"]) for nmk_data in garden["gardenNMKs"].values()]
+    imageLoader.prefetch(requests)
+
+def harvest_nmk(coordsStr):
+    answerQueue.join()
+    nmk_data = state.garden["gardenNMKs"].get(coordsStr)
+    if nmk_data is None:
+        return False
+    if nmk_data["nmk"] == SPROUT: # if not grown
+        sounds.queue("sprout")
+        return False
+    return bool(harvest_nmks([coordsStr]))
+
+def harvest_nmks(coordsStrs):
+    # harvests every grown mushroom among coordsStrs and commits them
+    # together; returns the slots that were harvested
+    answerQueue.join()
+    harvested = rules.harvest_many(state, coordsStrs)
+    if harvested:
+        sounds.queue("harvest", "fall")
+        commit_state()
+        answerQueue.submit(refresh_snapshot)
+    return harvested
+
+def load_settings():
+    # cached; reloaded at profile open, on save and on config updates
+    return gardenSettings.get()
+    
+def show_menu():
+    global menuDialog
+    if menuDialog is None:
+        menuDialog = MenuWindow(mw)
+    else:
+        menuDialog.reload()
+    menuDialog.exec()
+
+def build_shroomgarden():
+    global gardenDialog
+    if gardenDialog is None:
+        gardenDialog = Shroomgarden(mw)
+    gardenDialog.reload()
+    return gardenDialog
+
+def show_shroomgarden():
+    dialog = build_shroomgarden()
+    dialog.exec()
+
+def release_dialogs():
+    # they hold on to the profile's garden and collection
+    global gardenDialog, menuDialog
+    for dialog in (gardenDialog, menuDialog):
+        if dialog is not None:
+            dialog.deleteLater()
+    gardenDialog = None
+    menuDialog = None
+
+REWARD_MESSAGES = {
+    "shield": "You have earned a shield! You can use it to protect your mushrooms from withering once. Check your inventory from Mushroom Menu to use!",
+    "booster": "You have earned a booster! You can use it to increase spawn rate of rare mushrooms. Check your inventory from Mushroom Menu to use!",
+}
+
+def on_answer_card(reviewer, card, ease):
+    # only the timing is taken here; the garden is updated on a background
+    # thread so the next card isn't held up
+    now = time.time()
+    mw._a_end_time = now
+    total_time = now - mw._q_start_time
+    # a card in a filtered deck belongs to its home deck's garden
+    did = card.odid or card.did
+    settings = load_settings()
+    answerQueue.submit(lambda: process_answer(settings, ease, total_time, did), on_answer_processed)
+
+def process_answer(settings, ease, total_time, did):
+    # background thread, one answer at a time in answer order
+    state.ensure_loaded()
+
+    # each root deck grows its own garden
+    root_id = get_root_deck_id(did)
+    state.select(root_id)
+
+    # prevent withering when deck is completed
+    deckDone = cached_deck_tree_is_done(root_id)
+
+    outcome = rules.answer(state, settings, ease, total_time, deckDone)
+    if state.mark_dirty(answered=True):
+        state.flush()
+    if outcome.show_garden:
+        # draw the changes since the last popup before it opens
+        snapshot.refresh(state, state.deck)
+    return outcome
+
+def refresh_snapshot():
+    # answer queue; redraws whatever changed since the last refresh
+    if state.loaded:
+        snapshot.refresh(state, state.deck)
+
+def on_answer_processed(outcome):
+    # main thread. an answer finished after the profile closed has nothing
+    # left to show
+    if not state.loaded:
+        return
+    schedule_idle_flush()
+    if outcome.show_garden:
+        show_shroomgarden()
+    for item in outcome.rewards:
+        showInfo(REWARD_MESSAGES[item])
+
+def commit_state(answered=False):
+    # keep changes in memory and let the idle timer write them out, unless
+    # enough answers have accumulated since the last flush
+    answerQueue.join()
+    if state.mark_dirty(answered):
+        state.flush()
+    else:
+        schedule_idle_flush()
+
+def schedule_idle_flush():
+    global idleFlushTimer
+    if idleFlushTimer is None:
+        idleFlushTimer = QTimer(mw)
+        idleFlushTimer.setSingleShot(True)
+        idleFlushTimer.timeout.connect(flush_state)
+    idleFlushTimer.start(IDLE_FLUSH_MS)
+
+def flush_state():
+    answerQueue.join()
+    state.flush()
+
+def check_rarity_config():
+    # validate the rarity section now rather than on the first answer
+    sampler.rarity_config()
+    if sampler.problems:
+        tooltip("Shroomgarden rarity config fixed: " + "; ".join(sampler.problems))
+
+def on_profile_open():
+    invalidate_root_decks()
+    invalidate_deck_completion()
+    gardenSettings.load()
+    if gardenSettings.problems:
+        tooltip("Shroomgarden settings fixed: " + "; ".join(gardenSettings.problems))
+    answerQueue.join()
+    check_rarity_config()
+    snapshot.clear()
+    state.load()
+    if catchup.start(mw.col.db):
+        commit_state()
+    run_catchup(catchup.resume)
+
+def on_profile_close():
+    if idleFlushTimer is not None:
+        idleFlushTimer.stop()
+    answerQueue.join()
+    # the sync on close runs after this; note which reviews were ours so
+    # the next open can tell the synced ones apart
+    if state.loaded and catchup.before_close(mw.col.db):
+        state.mark_dirty()
+    state.unload()
+    snapshot.clear()
+    release_dialogs()
+    if bundles is not None:
+        bundles.close()
+
+def on_sync_start():
+    answerQueue.join()
+    # the sync on close runs after profile_will_close has unloaded the
+    # garden; on_profile_close saved what the catch-up needs for the next open
+    if not state.loaded:
+        return
+    catchup.before_sync(mw.col.db)
+    state.flush()
+
+def on_state_change(new_state, old_state):
+    if new_state == "review":
+        answerQueue.join()
+        state.ensure_loaded()
+        # the garden of the deck being reviewed, which only becomes the
+        # selected one with its first answer
+        garden = state.peek(get_root_deck_id(mw.col.decks.current()["id"]))
+        prefetch_theme(garden or DEFAULT_GARDEN)
+        answerQueue.submit(refresh_snapshot)
+
+def on_sync_finish():
+    invalidate_deck_completion()
+    answerQueue.join()
+    if not state.loaded:
+        return
+    run_catchup(catchup.after_sync)
+
+def run_catchup(catch_up):
+    # apply reviews made on other devices and write the result once
+    version = state.version
+    applied, rewards = catch_up(mw.col.db, load_settings())
+    if state.version != version:
+        state.mark_dirty()
+        state.flush()
+        answerQueue.submit(refresh_snapshot)
+    if applied:
+        message = f"Your garden grew from {applied} reviews made on other devices."
+        for item in sorted(set(rewards)):
+            message += f" Earned {rewards.count(item)} {item}(s)."
+        tooltip(message)
+
+def on_config_updated(config):
+    # the answer job reads the grids and the sampler
+    answerQueue.join()
+    spawnGrids.invalidate()
+    sampler.invalidate()
+    check_rarity_config()
+    gardenSettings.load()
@@ -0,0 +1,157 @@
+from aqt.qt import *
+
+PLACEHOLDER_COLOR = QColor(0, 0, 0, 40)
+# a press that moves less than this many pixels is a click, not a drag
+DRAG_THRESHOLD = 6
+
+
+class GardenCanvas(QWidget):
+    # paints the background and every mushroom itself instead of using one
+    # label widget per mushroom; clicks are hit-tested against sprite rects.
+    # images that are still being decoded are drawn as placeholders until
+    # pixmap_ready hands them over. dragging from an empty spot selects
+    # every mushroom the band touches. a composite of the whole garden, when
+    # given, is drawn instead until the mushrooms change
+    nmkClicked = pyqtSignal(str)
+    nmksSelected = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super(GardenCanvas, self).__init__(parent)
+        self.background_key = None
+        self.background = None
+        self.composite = None
+        self.nmks = {}
+        self.order = []
+        self.drag_origin = None
+        self.rubberBand = QRubberBand(QRubberBand.Shape.Rectangle, self)
+
+    def set_background(self, key, pixmap, size):
+        self.background_key = key
+        self.background = pixmap
+        self.setFixedSize(size[0], size[1])
+        self.update()
+
+    def set_composite(self, pixmap):
+        self.composite = pixmap
+        self.update()
+
+    def drop_composite(self):
+        # the composite no longer matches; repaint everything from layers
+        if self.composite is not None:
+            self.composite = None
+            self.update()
+
+    def nmk_rect(self, size, x, y):
+        # centre the image on x,y coord
+        return QRect(x - size[0] // 2, y - size[1] // 2, size[0], size[1])
+
+    def sort_nmks(self):
+        # lower rows are drawn last so they overlap the rows behind them
+        self.order = sorted(self.nmks, key=lambda coordsStr: (self.nmks[coordsStr][2].center().y(), self.nmks[coordsStr][2].center().x()))
+
+    def set_nmks(self, nmks):
+        self.nmks = {coordsStr: [key, pixmap, self.nmk_rect(size, x, y)] for coordsStr, key, pixmap, size, x, y in nmks}
+        self.sort_nmks()
+        self.update()
+
+    def set_nmk(self, coordsStr, key, pixmap, size, x, y):
+        old = self.nmks.get(coordsStr)
+        rect = self.nmk_rect(size, x, y)
+        self.nmks[coordsStr] = [key, pixmap, rect]
+        self.drop_composite()
+        if old is None:
+            self.sort_nmks()
+        else:
+            rect = rect.united(old[2])
+        self.update(rect)
+
+    def remove_nmk(self, coordsStr):
+        old = self.nmks.pop(coordsStr, None)
+        if old is None:
+            return
+        self.order.remove(coordsStr)
+        self.drop_composite()
+        # only the area the mushroom covered needs repainting
+        self.update(old[2])
+
+    def remove_nmks(self, coordsStrs):
+        # one pass over the draw order and one repaint for the whole batch
+        dirty = QRect()
+        for coordsStr in coordsStrs:
+            old = self.nmks.pop(coordsStr, None)
+            if old is not None:
+                dirty = dirty.united(old[2])
+        if dirty.isNull():
+            return
+        self.order = [coordsStr for coordsStr in self.order if coordsStr in self.nmks]
+        self.drop_composite()
+        self.update(dirty)
+
+    def nmks_in(self, rect):
+        return [coordsStr for coordsStr in self.order if self.nmks[coordsStr][2].intersects(rect)]
+
+    def pixmap_ready(self, key, pixmap):
+        if self.background is None and key == self.background_key:
+            self.background = pixmap
+            self.update()
+        for entry in self.nmks.values():
+            if entry[1] is None and entry[0] == key:
+                entry[1] = pixmap
+                self.update(entry[2])
+
+    def nmk_at(self, pos):
+        for coordsStr in reversed(self.order):
+            if self.nmks[coordsStr][2].contains(pos):
+                return coordsStr
+        return None
+
+    def paintEvent(self, event):
+        dirty = event.rect()
+        painter = QPainter(self)
+        if self.composite is not None:
+            painter.drawPixmap(dirty, self.composite, dirty)
+            painter.end()
+            return
+        if self.background is not None:
+            painter.drawPixmap(dirty, self.background, dirty)
+        else:
+            painter.fillRect(dirty, self.palette().window())
+        for coordsStr in self.order:
+            key, pixmap, rect = self.nmks[coordsStr]
+            if not rect.intersects(dirty):
+                continue
+            if pixmap is not None:
+                painter.drawPixmap(rect.topLeft(), pixmap)
+            else:
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(PLACEHOLDER_COLOR)
+                painter.drawEllipse(rect.adjusted(rect.width() // 4, rect.height() // 2, -rect.width() // 4, 0))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        pos = event.position().toPoint()
+        coordsStr = self.nmk_at(pos)
+        if coordsStr is not None:
+            self.nmkClicked.emit(coordsStr)
+        else:
+            self.drag_origin = pos
+
+    def mouseMoveEvent(self, event):
+        if self.drag_origin is None:
+            return
+        rect = QRect(self.drag_origin, event.position().toPoint()).normalized()
+        if rect.width() < DRAG_THRESHOLD and rect.height() < DRAG_THRESHOLD:
+            return
+        self.rubberBand.setGeometry(rect)
+        self.rubberBand.show()
+
+    def mouseReleaseEvent(self, event):
+        if self.drag_origin is None:
+            return
+        self.drag_origin = None
+        if not self.rubberBand.isVisible():
+            return
+        self.rubberBand.hide()
+        selected = self.nmks_in(self.rubberBand.geometry())
+        if selected:
+            self.nmksSelected.emit(selected)
@@ -0,0 +1,48 @@
+import json
+import os
+
+# one shared encoder; json.dumps builds a new one whenever options are passed
+compact_json = json.JSONEncoder(separators=(",", ":")).encode
+
+
+class GardenJournal:
+    # append-only file of applied garden events, one JSON line each as
+    # [seq, time, root deck id, event]. it only holds events newer than the
+    # last snapshot in the GardenStore and is emptied every time one is
+    # written
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def read(self):
+        entries = []
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line torn by a crash mid-append ends the journal
+                        break
+                    entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def append(self, entries):
+        if not entries:
+            return
+        if self.file is None:
+            self.file = open(self.path, "a")
+        self.file.write("".join(compact_json(entry) + "\n" for entry in entries))
+        self.file.flush()
+
+    def truncate(self):
+        self.close()
+        if os.path.exists(self.path):
+            open(self.path, "w").close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,234 @@
+import random
+
+from .sprite_catalog import SPROUT, theme_id
+from .spawn_grid import FreeSlots
+from .collection_index import CollectionIndex
+from .rarity_sampler import RaritySampler
+
+# chance that an answer starts a new mushroom instead of growing one
+SPAWN_CHANCE = 0.3
+# every this many seconds spent on a card withers one grown mushroom
+WITHER_SECONDS = 90
+# a booster lowers the common chance by this much, but not below the floor
+BOOSTER_RARE_BONUS = 0.3
+MIN_COMMON_CHANCE = 0.2
+# answers covered by one booster from the inventory
+BOOSTER_ANSWERS = 10
+# the ease button that counts towards rewards
+REWARD_EASE = 3
+
+
+def apply_event(garden, user, event):
+    # the only place garden and user data are mutated; events are plain
+    # dicts so they can be stored and replayed
+    kind = event["type"]
+    nmks = garden["gardenNMKs"]
+    if kind == "set":
+        garden[event["field"]] = event["value"]
+    elif kind == "set_user":
+        user[event["field"]] = event["value"]
+    elif kind == "spawn":
+        nmks[event["slot"]] = {"nmk": SPROUT, "x": event["x"], "y": event["y"], "stage": 0}
+        if event.get("upperRow"):
+            nmks[event["slot"]]["upperRow"] = True
+    elif kind == "grow":
+        nmks[event["slot"]]["stage"] = event["stage"]
+    elif kind == "bloom":
+        nmks[event["slot"]]["nmk"] = event["nmk"]
+    elif kind == "wither":
+        nmks[event["slot"]]["nmk"] = event["nmk"]
+        nmks[event["slot"]]["stage"] = event["stage"]
+    elif kind == "harvest":
+        del nmks[event["slot"]]
+        collected = user["collectedMushrooms"]
+        collected[event["nmk"]] = collected.get(event["nmk"], 0) + 1
+    elif kind == "reward":
+        inventory = user["inventory"]
+        inventory[event["item"]] = inventory.get(event["item"], 0) + 1
+    elif kind == "use_item":
+        user["inventory"][event["item"]] -= 1
+        if event["item"] == "shield":
+            garden["shield"] += 1
+        elif event["item"] == "booster":
+            garden["booster"] += BOOSTER_ANSWERS
+    else:
+        raise ValueError(f"unknown garden event {kind!r}")
+
+
+class GardenModel:
+    # garden and user data plus the live free-slot set and collection
+    # index, changed only through apply(); GardenState adds persistence on
+    # top of this
+    def __init__(self, garden=None, user=None):
+        self.garden = garden
+        self.user = user
+        self.free_slots = None
+        self.collection = None
+        # bumped by every event, so caches of the rendered garden can tell
+        # when they are stale
+        self.version = 0
+
+    def free_slots_for(self, grid):
+        # the free-slot set follows spawns and harvests incrementally and is
+        # only rebuilt from the grid when the garden theme changes
+        if self.free_slots is None or self.free_slots.grid is not grid:
+            occupied = [(v["x"], v["y"]) for v in self.garden["gardenNMKs"].values()]
+            self.free_slots = FreeSlots(grid, occupied)
+        return self.free_slots
+
+    def collection_for(self, catalog):
+        if self.collection is None or self.collection.catalog is not catalog:
+            self.collection = CollectionIndex(catalog, self.user["collectedMushrooms"])
+        return self.collection
+
+    def apply(self, event):
+        if event["type"] == "harvest":
+            nmk_data = self.garden["gardenNMKs"][event["slot"]]
+            pos = (nmk_data["x"], nmk_data["y"])
+            new_species = self.user["collectedMushrooms"].get(event["nmk"], 0) == 0
+        apply_event(self.garden, self.user, event)
+        self.version += 1
+        if event["type"] == "harvest" and new_species and self.collection is not None:
+            self.collection.add(event["nmk"])
+        if self.free_slots is None:
+            return
+        if event["type"] == "spawn":
+            self.free_slots.discard((event["x"], event["y"]))
+        elif event["type"] == "harvest":
+            self.free_slots.add(pos)
+
+
+class AnswerOutcome:
+    def __init__(self):
+        self.rewards = []
+        self.show_garden = False
+        self.garden_full = False
+
+
+class GardenRules:
+    # every garden rule that runs on an answer, a harvest or an item use;
+    # no Anki imports, so it can run headless with a seeded rng
+    def __init__(self, catalog, grids, rng=None, sampler=None):
+        self.catalog = catalog
+        self.grids = grids
+        self.rng = rng or random.Random()
+        self.sampler = sampler or RaritySampler(catalog)
+
+    def answer(self, model, settings, ease, total_time, deck_done):
+        garden = model.garden
+        outcome = AnswerOutcome()
+        reviewsPerNMK = settings["reviewsPerNMK"]
+
+        # change theme if all mushrooms are collected
+        theme = theme_id(garden["gardenName"])
+        if model.collection_for(self.catalog).complete(theme):
+            availableThemes = self.grids.theme_names()
+            ind = availableThemes.index(garden["gardenName"]) + 1
+            if ind < len(availableThemes):
+                model.apply({"type": "set", "field": "gardenName", "value": availableThemes[ind]})
+
+        # check if the mushrooms should wither
+        if total_time > WITHER_SECONDS and garden["cardsCompleted"] is False and garden["shield"] == 0:
+            numberWithers = int(total_time // WITHER_SECONDS)
+
+            # get only the grown mushrooms
+            grown_nmks = [
+                k for k, v in garden["gardenNMKs"].items()
+                if isinstance(v.get("stage"), int) and v["stage"] == (reviewsPerNMK - 1)
+            ]
+
+            # select sample of random mushrooms to wither
+            selected = self.rng.sample(grown_nmks, min(numberWithers, len(grown_nmks)))
+            witheredShroom = self.catalog.theme_shrooms(theme_id(garden["gardenName"]))
+            for coordsStr in selected:
+                model.apply({"type": "wither", "slot": coordsStr, "nmk": self.rng.choice(witheredShroom), "stage": reviewsPerNMK})
+
+        elif total_time > WITHER_SECONDS and garden["shield"] > 0:
+            # shield protects from withering once
+            model.apply({"type": "set", "field": "shield", "value": garden["shield"] - 1})
+
+        # prevent withering when deck is completed
+        if garden["cardsCompleted"] != deck_done:
+            model.apply({"type": "set", "field": "cardsCompleted", "value": deck_done})
+
+        if not garden["gardenNMKs"]: # no currently growing mushrooms
+            self.spawn(model)
+
+        elif self.rng.random() < SPAWN_CHANCE:
+            self.spawn(model)
+
+        else:
+            # randomly select an existing mushroom to grow
+            ungrown_nmks = [
+                k for k, v in garden["gardenNMKs"].items()
+                if isinstance(v.get("stage"), int) and v["stage"] < (reviewsPerNMK - 1)
+            ]
+            if not ungrown_nmks:
+                # all mushrooms are fully grown
+                outcome.garden_full = True
+                return outcome
+            select = self.rng.choice(ungrown_nmks)
+            stage = garden["gardenNMKs"][select]["stage"] + 1
+            model.apply({"type": "grow", "slot": select, "stage": stage})
+
+            # set the chance for common depending on whether boost is active
+            if garden["booster"] > 0:
+                common_chance = max(MIN_COMMON_CHANCE, settings["common_chance"] - BOOSTER_RARE_BONUS)
+                model.apply({"type": "set", "field": "booster", "value": garden["booster"] - 1})
+            else:
+                common_chance = settings["common_chance"]
+
+            # if the stage is greater than the configured review count, transform it into a grown mushroom
+            if stage > reviewsPerNMK - 2:
+                model.apply({"type": "bloom", "slot": select, "nmk": self.pick_bloom(theme_id(garden["gardenName"]), common_chance)})
+
+        if garden["cardCount"] > (settings["gardenShowInterval"] - 1):
+            model.apply({"type": "set", "field": "cardCount", "value": 0})
+            outcome.show_garden = True
+        else:
+            model.apply({"type": "set", "field": "cardCount", "value": garden["cardCount"] + 1})
+
+        # reward an item after accumulating enough good answers
+        if ease == REWARD_EASE:
+            easyCount = garden["easyCount"] + 1
+            if easyCount >= settings["rewardsThreshold"]:
+                easyCount = 0
+                # adjustable ratio between shield and booster
+                item = "shield" if self.rng.random() < settings["shieldRatio"] else "booster"
+                model.apply({"type": "reward", "item": item})
+                outcome.rewards.append(item)
+            model.apply({"type": "set", "field": "easyCount", "value": easyCount})
+
+        return outcome
+
+    def spawn(self, model):
+        garden = model.garden
+        grid = self.grids.grid(garden["gardenName"])
+        freeSlots = model.free_slots_for(grid)
+        if not freeSlots:
+            return None
+        x, y = freeSlots.choice(self.rng)
+        coordsStr = f"{x}_{y}"
+        model.apply({"type": "spawn", "slot": coordsStr, "x": x, "y": y, "upperRow": grid.is_upper_row(y)})
+        return coordsStr
+
+    def pick_bloom(self, theme, common_chance):
+        return self.sampler.draw(theme, common_chance, self.rng)
+
+    def harvest(self, model, coordsStr):
+        # returns the harvested mushroom, or None for sprouts and empty slots
+        nmk_data = model.garden["gardenNMKs"].get(coordsStr)
+        if nmk_data is None or nmk_data["nmk"] == SPROUT:
+            return None
+        model.apply({"type": "harvest", "slot": coordsStr, "nmk": nmk_data["nmk"]})
+        return nmk_data["nmk"]
+
+    def harvest_many(self, model, coordsStrs):
+        # returns the slots that held a grown mushroom and were harvested
+        return [coordsStr for coordsStr in coordsStrs if self.harvest(model, coordsStr) is not None]
+
+    def use_item(self, model, item):
+        if model.user["inventory"].get(item, 0) <= 0:
+            return False
+        model.apply({"type": "use_item", "item": item})
+        return True
@@ -0,0 +1,71 @@
+import json
+import math
+
+# name: (type, default, minimum, maximum); the bounds match the spin boxes
+# in the settings tab, None means unbounded
+SETTINGS_SCHEMA = {
+    "reviewsPerNMK": (int, 3, 2, None),
+    "gardenShowInterval": (int, 50, 30, None),
+    "common_chance": (float, 0.7, 0.6, 1.0),
+    "shieldRatio": (float, 0.6, 0.0, 1.0),
+    "rewardsThreshold": (int, 50, 20, None),
+}
+
+
+def validate_settings(data):
+    # returns the settings with every key present and in range, plus a list
+    # of problems that were fixed on the way
+    settings = {}
+    problems = []
+    if not isinstance(data, dict):
+        problems.append("settings are not a JSON object")
+        data = {}
+    for name, (kind, default, minimum, maximum) in SETTINGS_SCHEMA.items():
+        value = data.get(name, default)
+        # json.load accepts Infinity and NaN, which int() and the bounds
+        # checks can't handle
+        if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+                or (kind is int and value != int(value))):
+            problems.append(f"{name} should be a finite {kind.__name__}, using {default}")
+            value = default
+        value = kind(value)
+        if minimum is not None and value < minimum:
+            problems.append(f"{name} raised to {minimum}")
+            value = minimum
+        if maximum is not None and value > maximum:
+            problems.append(f"{name} lowered to {maximum}")
+            value = maximum
+        settings[name] = value
+    return settings, problems
+
+
+class Settings:
+    # settings.json read once and kept in memory; load() again only when the
+    # file is known to have changed
+    def __init__(self, path):
+        self.path = path
+        self.values = None
+        self.problems = []
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError:
+            data = None
+        self.values, self.problems = validate_settings(data)
+        return self.values
+
+    def get(self):
+        if self.values is None:
+            self.load()
+        return self.values
+
+    def save(self, new_settings):
+        self.values, self.problems = validate_settings(new_settings)
+        with open(self.path, "w") as f:
+            json.dump(self.values, f)
+            f.write("\n")
+        return self.values
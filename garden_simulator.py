@@ -0,0 +1,183 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .garden_rules import SPAWN_CHANCE, WITHER_SECONDS, BOOSTER_RARE_BONUS, MIN_COMMON_CHANCE, BOOSTER_ANSWERS, REWARD_EASE
+from .sprite_catalog import theme_id
+
+# probability of pressing again, hard, good and easy
+DEFAULT_EASE_PROBS = (0.1, 0.15, 0.6, 0.15)
+# answer times are log-normal around this many seconds
+DEFAULT_MEDIAN_ANSWER_SECONDS = 8.0
+DEFAULT_ANSWER_TIME_SIGMA = 1.0
+
+EMPTY = -1
+SPROUT_KIND = -1
+
+
+class SimulationResult:
+    def __init__(self, reviews, completed_at, collected, withered, rewards):
+        self.reviews = reviews
+        # review number at which each garden had every species, -1 if never
+        self.completed_at = completed_at
+        # (gardens, species) harvest counts; common species come first
+        self.collected = collected
+        self.withered = withered
+        self.rewards = rewards
+
+    def summary(self):
+        done = self.completed_at[self.completed_at >= 0]
+        summary = {
+            "gardens": len(self.completed_at),
+            "reviews": self.reviews,
+            "completed": len(done),
+            "distinct_collected_mean": float((self.collected > 0).sum(axis=1).mean()),
+            "harvested_mean": float(self.collected.sum(axis=1).mean()),
+            "withered_mean": float(self.withered.mean()),
+            "shields_mean": float(self.rewards[:, 0].mean()),
+            "boosters_mean": float(self.rewards[:, 1].mean()),
+        }
+        if len(done):
+            for q in (10, 50, 90):
+                summary[f"reviews_to_complete_p{q}"] = float(np.percentile(done, q))
+        return summary
+
+
+def random_slot(rng, mask):
+    # index of a uniformly random True entry per row, -1 for rows without one
+    running = mask.cumsum(axis=1, dtype=np.int16)
+    count = running[:, -1]
+    target = (rng.random(len(mask)) * count).astype(np.int16)
+    choice = (running > target[:, None]).argmax(axis=1)
+    choice[count == 0] = -1
+    return choice
+
+
+def simulate(settings, common_species, rare_species, slots, gardens=1000, reviews=10000, seed=None,
+             ease_probs=DEFAULT_EASE_PROBS, median_answer_seconds=DEFAULT_MEDIAN_ANSWER_SECONDS,
+             answer_time_sigma=DEFAULT_ANSWER_TIME_SIGMA, use_items=True):
+    # replays the answer rules from garden_rules for many gardens at once,
+    # one NumPy step per review. the simulated user harvests everything
+    # whenever the garden pops up and, with use_items, uses rewards at once
+    if np is None:
+        raise RuntimeError("the garden simulator needs numpy")
+    species = common_species + rare_species
+    if species == 0 or slots == 0:
+        raise ValueError("theme has no mushrooms or no spawn slots")
+
+    rng = np.random.default_rng(seed)
+    reviewsPerNMK = settings["reviewsPerNMK"]
+    grownStage = reviewsPerNMK - 1
+    G = gardens
+
+    stage = np.full((G, slots), EMPTY, dtype=np.int16)
+    kind = np.full((G, slots), SPROUT_KIND, dtype=np.int32)
+    shield = np.zeros(G, dtype=np.int32)
+    booster = np.zeros(G, dtype=np.int32)
+    cardCount = np.zeros(G, dtype=np.int32)
+    easyCount = np.zeros(G, dtype=np.int32)
+    collected = np.zeros((G, species), dtype=np.int32)
+    withered = np.zeros(G, dtype=np.int64)
+    rewards = np.zeros((G, 2), dtype=np.int64)
+    completed_at = np.full(G, -1, dtype=np.int64)
+
+    ease_cdf = np.cumsum(ease_probs)
+    ease_cdf /= ease_cdf[-1]
+    log_median = np.log(median_answer_seconds)
+
+    for review in range(reviews):
+        ease = np.searchsorted(ease_cdf, rng.random(G), side="right") + 1
+        total_time = rng.lognormal(log_median, answer_time_sigma, size=G)
+        overtime = total_time > WITHER_SECONDS
+
+        # check if the mushrooms should wither
+        wither_rows = np.nonzero(overtime & (shield == 0))[0]
+        if len(wither_rows):
+            grown = stage[wither_rows] == grownStage
+            keys = rng.random(grown.shape)
+            keys[~grown] = 2.0
+            rank = keys.argsort(axis=1).argsort(axis=1)
+            numberWithers = (total_time[wither_rows] // WITHER_SECONDS).astype(np.int64)
+            hit = grown & (rank < numberWithers[:, None])
+            r, c = np.nonzero(hit)
+            r = wither_rows[r]
+            stage[r, c] = reviewsPerNMK
+            kind[r, c] = rng.integers(0, species, size=len(r))
+            withered += np.bincount(r, minlength=G)
+        # shield protects from withering once
+        shield -= (overtime & (shield > 0)).astype(np.int32)
+
+        occupied = stage != EMPTY
+        spawn = ~occupied.any(axis=1) | (rng.random(G) < SPAWN_CHANCE)
+
+        # spawning gardens pick a free slot, the others an ungrown mushroom
+        ungrown = occupied & (stage < grownStage)
+        picked = random_slot(rng, np.where(spawn[:, None], ~occupied, ungrown))
+
+        ok = spawn & (picked >= 0)
+        stage[ok, picked[ok]] = 0
+        kind[ok, picked[ok]] = SPROUT_KIND
+
+        # a garden with nothing left to grow skips the rest of the answer
+        active = spawn | (picked >= 0)
+        g = np.nonzero(~spawn & (picked >= 0))[0]
+        slot = picked[g]
+        stage[g, slot] += 1
+
+        # set the chance for common depending on whether boost is active
+        boosted = booster[g] > 0
+        common_chance = np.where(boosted, max(MIN_COMMON_CHANCE, settings["common_chance"] - BOOSTER_RARE_BONUS), settings["common_chance"])
+        booster[g[boosted]] -= 1
+
+        bloom = stage[g, slot] > reviewsPerNMK - 2
+        g, slot, common_chance = g[bloom], slot[bloom], common_chance[bloom]
+        if len(g):
+            is_common = rng.random(len(g)) < common_chance
+            if rare_species == 0:
+                is_common[:] = True
+            elif common_species == 0:
+                is_common[:] = False
+            kind[g, slot] = np.where(is_common,
+                                     rng.integers(0, max(common_species, 1), size=len(g)),
+                                     common_species + rng.integers(0, max(rare_species, 1), size=len(g)))
+
+        show = active & (cardCount > settings["gardenShowInterval"] - 1)
+        cardCount[active & ~show] += 1
+        cardCount[show] = 0
+        show_rows = np.nonzero(show)[0]
+        if len(show_rows):
+            # harvest every mushroom that isn't a sprout
+            ripe = (stage[show_rows] != EMPTY) & (kind[show_rows] != SPROUT_KIND)
+            r, c = np.nonzero(ripe)
+            r = show_rows[r]
+            np.add.at(collected, (r, kind[r, c]), 1)
+            stage[r, c] = EMPTY
+            kind[r, c] = SPROUT_KIND
+            complete = (collected[show_rows] > 0).all(axis=1) & (completed_at[show_rows] < 0)
+            completed_at[show_rows[complete]] = review + 1
+
+        # reward an item after accumulating enough good answers
+        good = active & (ease == REWARD_EASE)
+        easyCount[good] += 1
+        earned = good & (easyCount >= settings["rewardsThreshold"])
+        easyCount[earned] = 0
+        earned_rows = np.nonzero(earned)[0]
+        if len(earned_rows):
+            is_shield = rng.random(len(earned_rows)) < settings["shieldRatio"]
+            rewards[earned_rows[is_shield], 0] += 1
+            rewards[earned_rows[~is_shield], 1] += 1
+            if use_items:
+                shield[earned_rows[is_shield]] += 1
+                booster[earned_rows[~is_shield]] += BOOSTER_ANSWERS
+
+    return SimulationResult(reviews, completed_at, collected, withered, rewards)
+
+
+def simulate_theme(catalog, grids, gardenName, settings, **kwargs):
+    theme = theme_id(gardenName)
+    return simulate(settings,
+                    len(catalog.common_shrooms(theme)),
+                    len(catalog.rare_shrooms(theme)),
+                    len(grids.grid(gardenName).positions),
+                    **kwargs)
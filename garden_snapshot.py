@@ -0,0 +1,117 @@
+from aqt.qt import *
+
+
+class GardenSnapshot:
+    # the selected garden composited into a single image, so the garden
+    # dialog can show one pixmap instead of drawing the background and every
+    # sprite when it opens. refresh() runs on the answer queue after the
+    # garden changes and only redraws the area of the slots that differ from
+    # the last render; the main thread reads it after joining the queue.
+    # the key is the deck, the theme and the state's version counter
+    def __init__(self, load_image, background_key, sprite_key):
+        self.load_image = load_image
+        self.background_key = background_key
+        self.sprite_key = sprite_key
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        self.version = None
+        self.image = None
+        self.background = None
+        # coordsStr -> (nmkName, x, y, rect, image) as last drawn
+        self.slots = {}
+        # decoded sprites of the current theme, keyed by (path, scale)
+        self.sprites = {}
+        self.pixmap = None
+        self.pixmap_version = None
+
+    def decode(self, key):
+        path, scale = key
+        image = self.load_image(path)
+        if scale != 1.0 and not image.isNull():
+            image = image.scaled(int(image.width() * scale),
+                                 int(image.height() * scale),
+                                 Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        return image
+
+    def sprite(self, nmkName):
+        key = self.sprite_key(nmkName)
+        image = self.sprites.get(key)
+        if image is None:
+            image = self.decode(key)
+            self.sprites[key] = image
+        return image
+
+    def is_current(self, model, deck):
+        return self.image is not None and self.version == model.version and self.key == (deck, model.garden["gardenName"])
+
+    def refresh(self, model, deck):
+        garden = model.garden
+        key = (deck, garden["gardenName"])
+        if self.is_current(model, deck):
+            return
+        dirty = QRect()
+        if key != self.key:
+            self.clear()
+            self.key = key
+            self.background = self.decode(self.background_key(garden["gardenName"]))
+            if not self.background.isNull():
+                self.image = QImage(self.background.size(), QImage.Format.Format_ARGB32_Premultiplied)
+                dirty = self.image.rect()
+        if self.image is None:
+            # no background to draw on; the dialog draws this theme itself
+            return
+        nmks = garden["gardenNMKs"]
+        for coordsStr in list(self.slots):
+            if coordsStr not in nmks:
+                dirty = dirty.united(self.slots.pop(coordsStr)[3])
+        for coordsStr, nmk_data in nmks.items():
+            nmkName, x, y = nmk_data["nmk"], nmk_data["x"], nmk_data["y"]
+            old = self.slots.get(coordsStr)
+            if old is not None and old[:3] == (nmkName, x, y):
+                continue
+            image = self.sprite(nmkName)
+            # centred on x,y like the canvas draws it
+            rect = QRect(x - image.width() // 2, y - image.height() // 2, image.width(), image.height())
+            self.slots[coordsStr] = (nmkName, x, y, rect, image)
+            dirty = dirty.united(rect)
+            if old is not None:
+                dirty = dirty.united(old[3])
+        if not dirty.isNull():
+            self.draw(dirty)
+        self.version = model.version
+
+    def draw(self, dirty):
+        painter = QPainter(self.image)
+        painter.setClipRect(dirty)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.drawImage(dirty, self.background, dirty)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        # lower rows last so they overlap the rows behind them
+        entries = sorted((entry for entry in self.slots.values() if entry[3].intersects(dirty)),
+                         key=lambda entry: (entry[3].center().y(), entry[3].center().x()))
+        for nmkName, x, y, rect, image in entries:
+            if not image.isNull():
+                painter.drawImage(rect.topLeft(), image)
+        painter.end()
+
+    def stats(self):
+        images = [self.image, self.background] + list(self.sprites.values())
+        total = sum(image.sizeInBytes() for image in images if image is not None)
+        if self.pixmap is not None:
+            total += self.pixmap.width() * self.pixmap.height() * max(self.pixmap.depth(), 8) // 8
+        return {"sprites": len(self.sprites), "bytes": total}
+
+    def pixmap_for(self, model, deck):
+        # main thread, with the answer queue joined. a garden changed since
+        # the last refresh is patched here; one that was never rendered
+        # returns None and the caller draws it the slow way
+        if self.image is None or self.key != (deck, model.garden["gardenName"]):
+            return None
+        self.refresh(model, deck)
+        if self.pixmap is None or self.pixmap_version != self.version:
+            self.pixmap = QPixmap.fromImage(self.image)
+            self.pixmap_version = self.version
+        return self.pixmap
@@ -0,0 +1,31 @@
+import os
+
+from aqt.qt import *
+
+# sounds queued within this many ms of each other play once
+DEBOUNCE_MS = 80
+
+
+class SoundBoard(QObject):
+    # the add-on's sound files, looked up once by name. queue() collects the
+    # sounds asked for during a burst of harvests and plays each of them a
+    # single time when the burst is over
+    def __init__(self, sounds, play, parent=None):
+        super(SoundBoard, self).__init__(parent)
+        self.paths = {name: path for name, path in sounds.items() if os.path.exists(path)}
+        self.play = play
+        self.pending = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.play_pending)
+
+    def queue(self, *names):
+        for name in names:
+            if name in self.paths and name not in self.pending:
+                self.pending.append(name)
+        self.timer.start(DEBOUNCE_MS)
+
+    def play_pending(self):
+        pending, self.pending = self.pending, []
+        for name in pending:
+            self.play(self.paths[name])
@@ -0,0 +1,239 @@
+import json
+import os
+import time
+
+from .garden_rules import GardenModel
+from .garden_store import GardenStore, LEGACY_DECK
+from .garden_journal import GardenJournal
+
+# flush to disk after this many answers even if Anki never goes idle
+FLUSH_EVERY_N_ANSWERS = 25
+
+DEFAULT_GARDEN = {
+    "gardenName": "10001_Normal_Garden.webp",
+    "gardenNMKs": {},
+    "cardsCompleted": False,
+    "shield": 0,
+    "booster": 0,
+    "cardCount": 0,
+    "easyCount": 0,
+}
+
+DEFAULT_USER_DATA = {
+    "collectedMushrooms": {},
+    "inventory": {"shield": 0, "booster": 0},
+}
+
+
+def changed_rows(event, deck):
+    # the storage rows an event on deck's garden touches, as (table, key)
+    # pairs; garden fields and slots are keyed by (deck, key)
+    kind = event["type"]
+    if kind == "set":
+        return [("garden", (deck, event["field"]))]
+    if kind == "set_user":
+        return [("user", event["field"])]
+    if kind in ("spawn", "grow", "bloom", "wither"):
+        return [("slot", (deck, event["slot"]))]
+    if kind == "harvest":
+        return [("slot", (deck, event["slot"])), ("collected", event["nmk"])]
+    if kind == "reward":
+        return [("inventory", event["item"])]
+    if kind == "use_item":
+        return [("inventory", event["item"]), ("garden", (deck, "shield")), ("garden", (deck, "booster"))]
+    return []
+
+
+def with_defaults(data, defaults):
+    for key, value in defaults.items():
+        data.setdefault(key, json.loads(json.dumps(value)))
+    return data
+
+
+def read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return json.loads(json.dumps(default))
+
+
+class GardenState(GardenModel):
+    # process-wide copy of the user data and the gardens read so far, one
+    # per root deck. garden is the selected deck's garden; every hook reads
+    # these dicts and changes them through apply(). applied events are appended
+    # to the journal on every commit, and on flush the rows they touched
+    # are written to the profile's GardenStore as a new snapshot and the
+    # journal is emptied. loading replays
+    # whatever the journal holds past the snapshot. currentGarden.json and
+    # userData.json are only read once, to migrate
+    def __init__(self, db_path, garden_file, user_file):
+        super(GardenState, self).__init__()
+        self.db_path = db_path
+        self.garden_file = garden_file
+        self.user_file = user_file
+        self.store = None
+        self.journal = None
+        # root deck id -> garden, and the selected deck's id
+        self.shards = {}
+        self.shard_free_slots = {}
+        self.deck = None
+        # the deck that took over the legacy garden this session
+        self.legacy_claimed_by = None
+        self.seq = 0
+        # events not yet in the journal
+        self.unjournaled = []
+        self.changes = set()
+        self.dirty = False
+        self.answers_since_flush = 0
+
+    @property
+    def loaded(self):
+        return self.user is not None
+
+    def load(self):
+        self.close()
+        path = self.db_path()
+        self.store = GardenStore(path)
+        self.journal = GardenJournal(os.path.splitext(path)[0] + ".events")
+        if self.store.is_new():
+            garden = with_defaults(read_json(self.garden_file, DEFAULT_GARDEN), DEFAULT_GARDEN)
+            self.user = with_defaults(read_json(self.user_file, DEFAULT_USER_DATA), DEFAULT_USER_DATA)
+            self.store.write_all(LEGACY_DECK, garden, self.user)
+        else:
+            self.user = with_defaults(self.store.read_user(), DEFAULT_USER_DATA)
+        self.shards = {}
+        self.shard_free_slots = {}
+        self.deck = None
+        self.legacy_claimed_by = None
+        self.garden = None
+        self.changes = set()
+        self.unjournaled = []
+        self.dirty = False
+        self.answers_since_flush = 0
+        self.free_slots = None
+        self.collection = None
+        self.seq = self.store.snapshot_seq()
+
+        # recover the events that were journaled after the last snapshot
+        for seq, t, deck, event in self.journal.read():
+            if seq <= self.seq:
+                continue
+            self.switch(deck)
+            GardenModel.apply(self, event)
+            self.changes.update(changed_rows(event, deck))
+            self.dirty = True
+            self.seq = seq
+        if self.dirty:
+            self.flush()
+        else:
+            # drop a torn last line so new appends start on a fresh one
+            self.journal.truncate()
+        self.switch(self.user.get("currentDeck", LEGACY_DECK))
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def select(self, deck):
+        # makes a root deck's garden the one answers, the menu and the garden
+        # dialog work on, and remembers the choice
+        self.switch(deck)
+        if self.user.get("currentDeck") != deck:
+            self.apply({"type": "set_user", "field": "currentDeck", "value": deck})
+
+    def follow(self, deck):
+        # the legacy garden lives on under the deck that claimed it
+        if deck == LEGACY_DECK and self.legacy_claimed_by is not None:
+            return self.legacy_claimed_by
+        return deck
+
+    def peek(self, deck):
+        # the garden a root deck would get if it was selected now, without
+        # selecting it: its own, or the legacy one it would take over. None
+        # if it would start a new one
+        for candidate in (deck, LEGACY_DECK):
+            garden = self.shards.get(candidate)
+            if garden is None:
+                garden = self.store.read_shard(candidate)
+                if garden is None:
+                    continue
+                self.shards[candidate] = with_defaults(garden, DEFAULT_GARDEN)
+            return garden
+        return None
+
+    def switch(self, deck):
+        if deck == self.deck:
+            return
+        if self.deck is not None:
+            self.shard_free_slots[self.deck] = self.free_slots
+        garden = self.shards.get(deck)
+        if garden is None:
+            garden = self.store.read_shard(deck)
+            if garden is None:
+                garden = self.new_shard(deck)
+            self.shards[deck] = with_defaults(garden, DEFAULT_GARDEN)
+        self.deck = deck
+        self.garden = garden
+        self.free_slots = self.shard_free_slots.get(deck)
+
+    def new_shard(self, deck):
+        # the first deck without a garden takes over the one from before
+        # gardens were per deck; later ones start empty
+        if deck != LEGACY_DECK and (LEGACY_DECK in self.shards or self.store.has_shard(LEGACY_DECK)):
+            # write out pending changes while they are still keyed by the old id
+            self.dirty = True
+            self.flush()
+            self.store.move_shard(LEGACY_DECK, deck)
+            self.legacy_claimed_by = deck
+            self.shard_free_slots[deck] = self.shard_free_slots.pop(LEGACY_DECK, None)
+            garden = self.shards.pop(LEGACY_DECK, None)
+            return garden if garden is not None else self.store.read_shard(deck)
+        garden = with_defaults({}, DEFAULT_GARDEN)
+        self.changes.update(("garden", (deck, field)) for field in garden)
+        return garden
+
+    def apply(self, event):
+        super(GardenState, self).apply(event)
+        self.changes.update(changed_rows(event, self.deck))
+        self.seq += 1
+        self.unjournaled.append((self.seq, int(time.time()), self.deck, event))
+
+    def mark_dirty(self, answered=False):
+        # returns True once enough answers have piled up that the caller
+        # should flush right away instead of waiting for idle
+        self.dirty = True
+        self.journal.append(self.unjournaled)
+        self.unjournaled = []
+        if answered:
+            self.answers_since_flush += 1
+        return self.answers_since_flush >= FLUSH_EVERY_N_ANSWERS
+
+    def flush(self):
+        if not self.loaded or not self.dirty:
+            return
+        self.store.write(self.shards, self.user, self.changes, self.seq)
+        self.journal.truncate()
+        self.changes = set()
+        self.unjournaled = []
+        self.dirty = False
+        self.answers_since_flush = 0
+
+    def unload(self):
+        self.flush()
+        self.close()
+        self.shards = {}
+        self.shard_free_slots = {}
+        self.deck = None
+        self.garden = None
+        self.user = None
+        self.free_slots = None
+        self.collection = None
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+
+from .sprite_catalog import parse_sprite_name
+
+SCHEMA_VERSION = 1
+
+# the garden that existed before gardens were kept per root deck; the first
+# deck answered takes it over
+LEGACY_DECK = 0
+
+SCHEMA = """
+create table if not exists shard_fields (
+    deck integer not null,
+    field text not null,
+    value text not null,
+    primary key (deck, field)
+);
+create table if not exists shard_slots (
+    deck integer not null,
+    slot text not null,
+    x integer not null,
+    y integer not null,
+    nmk text not null,
+    stage integer,
+    upper_row integer not null default 0,
+    primary key (deck, slot)
+);
+create table if not exists collected (nmk text primary key, theme text not null, count integer not null);
+create index if not exists collected_theme on collected (theme);
+create table if not exists inventory (item text primary key, count integer not null);
+create table if not exists user_fields (field text primary key, value text not null);
+create table if not exists meta (key text primary key, value integer not null);
+"""
+
+def sprite_theme(nmkName):
+    parsed = parse_sprite_name(nmkName)
+    return parsed[1] if parsed else ""
+
+
+class GardenStore:
+    # the gardens, collection and inventory in a small SQLite database in the
+    # profile folder. each root deck's garden is a shard of rows keyed by the
+    # deck id, read the first time that deck is answered. one row per garden
+    # field, slot, species and item, so a write only touches the rows that
+    # changed
+    def __init__(self, path):
+        self.path = path
+        # answers are applied on a background thread; the answer queue makes
+        # sure only one thread uses it at a time
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("pragma journal_mode = wal")
+        self.db.execute("pragma synchronous = normal")
+        self.db.executescript(SCHEMA)
+
+    def version(self):
+        return self.db.execute("pragma user_version").fetchone()[0]
+
+    def is_new(self):
+        return self.version() == 0
+
+    def read_user(self):
+        user = {field: json.loads(value) for field, value in self.db.execute("select field, value from user_fields")}
+        user["collectedMushrooms"] = dict(self.db.execute("select nmk, count from collected"))
+        user["inventory"] = dict(self.db.execute("select item, count from inventory"))
+        return user
+
+    def read_shard(self, deck):
+        # returns None for a deck that has no garden yet
+        garden = {field: json.loads(value) for field, value in self.db.execute(
+            "select field, value from shard_fields where deck = ?", (deck,))}
+        if not garden:
+            return None
+        nmks = {}
+        for slot, x, y, nmk, stage, upper_row in self.db.execute(
+                "select slot, x, y, nmk, stage, upper_row from shard_slots where deck = ?", (deck,)):
+            nmks[slot] = {"nmk": nmk, "x": x, "y": y}
+            if stage is not None:
+                nmks[slot]["stage"] = stage
+            if upper_row:
+                nmks[slot]["upperRow"] = True
+        garden["gardenNMKs"] = nmks
+        return garden
+
+    def has_shard(self, deck):
+        return self.db.execute("select 1 from shard_fields where deck = ? limit 1", (deck,)).fetchone() is not None
+
+    def move_shard(self, old_deck, new_deck):
+        with self.transaction():
+            self.db.execute("update shard_fields set deck = ? where deck = ?", (new_deck, old_deck))
+            self.db.execute("update shard_slots set deck = ? where deck = ?", (new_deck, old_deck))
+
+    def snapshot_seq(self):
+        # the journal sequence number of the last event in the snapshot
+        row = self.db.execute("select value from meta where key = 'snapshot_seq'").fetchone()
+        return row[0] if row else 0
+
+    def write(self, shards, user, changes, seq=None):
+        # changes holds (table, key) pairs, with (deck, key) as the key for
+        # garden fields and slots; each is written from the loaded shards and
+        # user data, all in one transaction together with the journal
+        # sequence number they are current up to
+        with self.transaction():
+            if seq is not None:
+                self.db.execute("insert or replace into meta (key, value) values ('snapshot_seq', ?)", (seq,))
+            for table, key in changes:
+                if table == "garden":
+                    deck, field = key
+                    self.write_garden_field(deck, shards[deck], field)
+                elif table == "slot":
+                    deck, slot = key
+                    self.write_slot(deck, slot, shards[deck]["gardenNMKs"].get(slot))
+                elif table == "collected":
+                    self.write_collected(key, user["collectedMushrooms"].get(key))
+                elif table == "inventory":
+                    self.write_inventory(key, user["inventory"].get(key))
+                elif table == "user":
+                    self.write_user_field(user, key)
+
+    def write_all(self, deck, garden, user):
+        # replaces everything with a single garden, used for the migration
+        # from the JSON files
+        with self.transaction():
+            for table in ("shard_fields", "shard_slots", "collected", "inventory", "user_fields"):
+                self.db.execute(f"delete from {table}")
+            for field in garden:
+                self.write_garden_field(deck, garden, field)
+            for slot, nmk_data in garden["gardenNMKs"].items():
+                self.write_slot(deck, slot, nmk_data)
+            for nmkName, count in user["collectedMushrooms"].items():
+                self.write_collected(nmkName, count)
+            for item, count in user["inventory"].items():
+                self.write_inventory(item, count)
+            for field in user:
+                self.write_user_field(user, field)
+            self.db.execute(f"pragma user_version = {SCHEMA_VERSION}")
+
+    def write_garden_field(self, deck, garden, field):
+        if field == "gardenNMKs":
+            return
+        self.db.execute("insert or replace into shard_fields (deck, field, value) values (?, ?, ?)",
+                        (deck, field, json.dumps(garden[field])))
+
+    def write_slot(self, deck, slot, nmk_data):
+        if nmk_data is None:
+            self.db.execute("delete from shard_slots where deck = ? and slot = ?", (deck, slot))
+            return
+        stage = nmk_data.get("stage")
+        self.db.execute(
+            "insert or replace into shard_slots (deck, slot, x, y, nmk, stage, upper_row) values (?, ?, ?, ?, ?, ?, ?)",
+            (deck, slot, nmk_data["x"], nmk_data["y"], nmk_data["nmk"],
+             stage if isinstance(stage, int) else None, int(bool(nmk_data.get("upperRow")))))
+
+    def write_collected(self, nmkName, count):
+        if count is None:
+            self.db.execute("delete from collected where nmk = ?", (nmkName,))
+            return
+        self.db.execute("insert or replace into collected (nmk, theme, count) values (?, ?, ?)",
+                        (nmkName, sprite_theme(nmkName), count))
+
+    def write_inventory(self, item, count):
+        if count is None:
+            self.db.execute("delete from inventory where item = ?", (item,))
+            return
+        self.db.execute("insert or replace into inventory (item, count) values (?, ?)", (item, count))
+
+    def write_user_field(self, user, field):
+        if field in ("collectedMushrooms", "inventory"):
+            return
+        if field not in user:
+            self.db.execute("delete from user_fields where field = ?", (field,))
+            return
+        self.db.execute("insert or replace into user_fields (field, value) values (?, ?)",
+                        (field, json.dumps(user[field])))
+
+    @contextmanager
+    def transaction(self):
+        self.db.execute("begin immediate")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("rollback")
+            raise
+        self.db.execute("commit")
+
+    def close(self):
+        self.db.close()
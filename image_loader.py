@@ -0,0 +1,60 @@
+from aqt.qt import *
+
+# decoding runs on its own small pool so it never competes with Anki's
+# background operations or blocks the main thread
+DECODE_THREADS = 2
+
+
+class DecodeTask(QRunnable):
+    def __init__(self, loader, path, scale):
+        super(DecodeTask, self).__init__()
+        self.loader = loader
+        self.path = path
+        self.scale = scale
+
+    def run(self):
+        image = self.loader.load_image(self.path)
+        if self.scale != 1.0 and not image.isNull():
+            image = image.scaled(int(image.width() * self.scale),
+                                 int(image.height() * self.scale),
+                                 Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        # queued back to the loader's thread, which is the main thread
+        self.loader.decoded.emit(self.path, self.scale, image)
+
+
+class ImageLoader(QObject):
+    # decodes images into QImage on worker threads and hands them to the
+    # pixmap cache; pixmapReady fires on the main thread once one is cached
+    decoded = pyqtSignal(str, float, QImage)
+    pixmapReady = pyqtSignal(str, float)
+
+    def __init__(self, cache, load_image, parent=None):
+        super(ImageLoader, self).__init__(parent)
+        self.cache = cache
+        self.load_image = load_image
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(DECODE_THREADS)
+        self.decoded.connect(self.on_decoded)
+
+    def request(self, path, scale=1.0):
+        # returns the pixmap straight away if it's cached, otherwise None and
+        # the caller waits for pixmapReady
+        pixmap = self.cache.peek(path, scale)
+        if pixmap is not None:
+            return pixmap
+        key = (path, scale)
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(DecodeTask(self, path, scale))
+        return None
+
+    def prefetch(self, requests):
+        for path, scale in requests:
+            self.request(path, scale)
+
+    def on_decoded(self, path, scale, image):
+        self.pending.discard((path, scale))
+        self.cache.put((path, scale), QPixmap.fromImage(image))
+        self.pixmapReady.emit(path, scale)
@@ -0,0 +1,102 @@
+from aqt.qt import *
+
+NameRole = Qt.ItemDataRole.UserRole + 1
+ThemeRole = Qt.ItemDataRole.UserRole + 2
+RarityRole = Qt.ItemDataRole.UserRole + 3
+CountRole = Qt.ItemDataRole.UserRole + 4
+
+# position of the value each role sorts by in a model row; rarity sorts by
+# the tier's rank, not its name
+ROW_FIELDS = {NameRole: 0, ThemeRole: 1, RarityRole: 5, CountRole: 3}
+
+
+class MushroomIndexModel(QAbstractListModel):
+    # one row per collected species; thumbnails are only requested when the
+    # view asks for a row's decoration, i.e. once the row becomes visible.
+    # rarity is the species' tier in the sampler's rarity config
+    def __init__(self, collected, catalog, sampler, imageLoader, thumbnail_key, parent=None):
+        super(MushroomIndexModel, self).__init__(parent)
+        self.imageLoader = imageLoader
+        self.catalog = catalog
+        self.sampler = sampler
+        self.thumbnail_key = thumbnail_key
+        self.rows = []
+        self.row_of_key = {}
+        self.set_collected(collected)
+        imageLoader.pixmapReady.connect(self.on_pixmap_ready)
+
+    def set_collected(self, collected):
+        # rebuilds the rows when the menu is shown again
+        self.beginResetModel()
+        self.rows = []
+        self.row_of_key = {}
+        rank = {tier: i for i, tier in enumerate(self.sampler.tiers())}
+        for nmkName, count in collected.items():
+            parsed = self.catalog.info.get(nmkName)
+            theme = parsed[1] if parsed else ""
+            rarity = self.sampler.tier(parsed[0] if parsed else None)
+            key = self.thumbnail_key(nmkName)
+            self.row_of_key[key] = len(self.rows)
+            self.rows.append((nmkName, theme, rarity, count, key, rank[rarity]))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        nmkName, theme, rarity, count, key, rank = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"x{count}"
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.imageLoader.request(*key)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return nmkName
+        if role == NameRole:
+            return nmkName
+        if role == ThemeRole:
+            return theme
+        if role == RarityRole:
+            return rarity
+        if role == CountRole:
+            return count
+        return None
+
+    def sort_by(self, role, order=Qt.SortOrder.AscendingOrder):
+        # sorting here in Python is one C-level sort; sorting in the proxy
+        # calls back into data() for every comparison
+        field = ROW_FIELDS[role]
+        self.layoutAboutToBeChanged.emit()
+        self.rows.sort(key=lambda row: (row[field], row[0]), reverse=order == Qt.SortOrder.DescendingOrder)
+        self.row_of_key = {row[4]: i for i, row in enumerate(self.rows)}
+        self.layoutChanged.emit()
+
+    def on_pixmap_ready(self, path, scale):
+        row = self.row_of_key.get((path, scale))
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class MushroomIndexFilter(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super(MushroomIndexFilter, self).__init__(parent)
+        self.theme = None
+        self.rarity = None
+
+    def set_theme(self, theme):
+        self.theme = theme
+        self.invalidateFilter()
+
+    def set_rarity(self, rarity):
+        self.rarity = rarity
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        nmkName, theme, rarity, count, key, rank = self.sourceModel().rows[source_row]
+        if self.theme and theme != self.theme:
+            return False
+        if self.rarity and rarity != self.rarity:
+            return False
+        return True
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+from aqt.qt import *
+
+# upper bound on the decoded pixel data kept around, in bytes
+PIXMAP_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class PixmapCache:
+    # decoded and scaled pixmaps keyed by (path, scale), shared by the garden
+    # and the menu dialogs and evicted least recently used first
+    def __init__(self, max_bytes=PIXMAP_CACHE_BYTES, loader=QPixmap):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, scale=1.0):
+        key = (path, scale)
+        pixmap = self.entries.get(key)
+        if pixmap is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return pixmap
+
+        self.misses += 1
+        pixmap = self.loader(path)
+        if scale != 1.0:
+            pixmap = pixmap.scaled(int(pixmap.width() * scale),
+                                   int(pixmap.height() * scale),
+                                   Qt.AspectRatioMode.KeepAspectRatio,
+                                   Qt.TransformationMode.SmoothTransformation)
+        self.put(key, pixmap)
+        return pixmap
+
+    def peek(self, path, scale=1.0):
+        # like get, but leaves decoding a missing image to the caller
+        key = (path, scale)
+        pixmap = self.entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= pixmap_bytes(old)
+        self.entries[key] = pixmap
+        self.total_bytes += pixmap_bytes(pixmap)
+        # always keep the newest entry, even if it alone is over budget
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= pixmap_bytes(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
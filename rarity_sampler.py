@@ -0,0 +1,168 @@
+import math
+
+from .sprite_catalog import COMMON_SPECIES
+
+COMMON_TIER = "common"
+# species that no tier in the config lists
+DEFAULT_TIER = "rare"
+
+DEFAULT_RARITY_CONFIG = {
+    "tiers": {COMMON_TIER: [COMMON_SPECIES]},
+    "tierWeights": {DEFAULT_TIER: 1.0},
+    "speciesWeights": {},
+}
+
+
+def is_weight(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and math.isfinite(value) and value >= 0
+
+
+def validate_rarity_config(data):
+    # returns the rarity section with anything malformed dropped, plus a list
+    # of what was dropped
+    problems = []
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return dict(DEFAULT_RARITY_CONFIG), ["rarity is not an object, using the default tiers"]
+    config = {}
+    tiers = data.get("tiers", DEFAULT_RARITY_CONFIG["tiers"])
+    if not isinstance(tiers, dict):
+        problems.append("rarity.tiers is not an object, using the default tiers")
+        tiers = DEFAULT_RARITY_CONFIG["tiers"]
+    config["tiers"] = {}
+    for tier, species in tiers.items():
+        if not isinstance(species, list) or not all(isinstance(s, str) for s in species):
+            problems.append(f"rarity.tiers.{tier} is not a list of species, ignored")
+            continue
+        config["tiers"][tier] = species
+    for section in ("tierWeights", "speciesWeights"):
+        weights = data.get(section, DEFAULT_RARITY_CONFIG[section])
+        if not isinstance(weights, dict):
+            problems.append(f"rarity.{section} is not an object, ignored")
+            weights = DEFAULT_RARITY_CONFIG[section]
+        config[section] = {}
+        for name, weight in weights.items():
+            if not is_weight(weight):
+                problems.append(f"rarity.{section}.{name} is not a non-negative number, ignored")
+                continue
+            config[section][name] = float(weight)
+    return config, problems
+
+
+class AliasTable:
+    # Vose's alias method: O(n) to build, two random numbers per draw
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+        self.items = list(items)
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # whatever is left is 1 up to rounding
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def draw(self, rng):
+        i = int(rng.random() * len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class RaritySampler:
+    # picks the mushroom a bloom turns into. the common tier gets
+    # common_chance, the other tiers share the rest by their tier weight and
+    # species share their tier by species weight, all from the add-on
+    # config. each theme gets one alias table per common chance, so the
+    # booster's lower common chance is a second cached table, not a rebuild
+    def __init__(self, catalog, load_config=lambda: DEFAULT_RARITY_CONFIG):
+        self.catalog = catalog
+        self.load_config = load_config
+        self.config = None
+        self.problems = []
+        self.tables = {}
+
+    def rarity_config(self):
+        if self.config is None:
+            config, self.problems = validate_rarity_config(self.load_config())
+            self.config = self.compile(config)
+        return self.config
+
+    def compile(self, config):
+        tier_of = {}
+        for tier, species in config["tiers"].items():
+            for s in species:
+                tier_of[s] = tier
+        return (tier_of, config["tierWeights"], config["speciesWeights"])
+
+    def tier(self, species):
+        return self.rarity_config()[0].get(species, DEFAULT_TIER)
+
+    def tiers(self):
+        # every tier name, the common tier first and then by weight, most
+        # frequent first
+        tier_of, tier_weights, species_weights = self.rarity_config()
+        others = (set(tier_of.values()) | {DEFAULT_TIER}) - {COMMON_TIER}
+        return [COMMON_TIER] + sorted(others, key=lambda tier: (-tier_weights.get(tier, 1.0), tier))
+
+    def table(self, theme, common_chance):
+        key = (theme, common_chance)
+        table = self.tables.get(key)
+        if table is None:
+            table = self.build(theme, common_chance)
+            self.tables[key] = table
+        return table
+
+    def build(self, theme, common_chance):
+        try:
+            return self.build_from(self.rarity_config(), theme, common_chance)
+        except ValueError:
+            # every weight in this theme is 0; fall back to the default
+            # common/rare split rather than failing the bloom
+            self.problems.append(f"rarity weights leave theme {theme} with nothing to drop, using the default tiers")
+            return self.build_from(self.compile(DEFAULT_RARITY_CONFIG), theme, common_chance)
+
+    def build_from(self, config, theme, common_chance):
+        tier_of, tier_weights, species_weights = config
+        tiers = {}
+        for name in self.catalog.theme_shrooms(theme):
+            species = self.catalog.info[name][0]
+            weight = species_weights.get(species, 1.0)
+            tiers.setdefault(tier_of.get(species, DEFAULT_TIER), []).append((name, weight))
+        tiers = {tier: entries for tier, entries in tiers.items() if sum(w for _, w in entries) > 0}
+
+        # a tier missing from the theme hands its share to the others
+        other_weights = {tier: tier_weights.get(tier, 1.0) for tier in tiers if tier != COMMON_TIER}
+        other_total = sum(other_weights.values())
+        tier_chance = {}
+        if COMMON_TIER in tiers:
+            tier_chance[COMMON_TIER] = common_chance if other_total > 0 else 1.0
+        rest = 1.0 - tier_chance.get(COMMON_TIER, 0.0)
+        for tier, weight in other_weights.items():
+            tier_chance[tier] = rest * weight / other_total if other_total > 0 else 0.0
+
+        names = []
+        weights = []
+        for tier, entries in tiers.items():
+            tier_total = sum(w for _, w in entries)
+            for name, weight in entries:
+                names.append(name)
+                weights.append(tier_chance[tier] * weight / tier_total)
+        return AliasTable(names, weights)
+
+    def draw(self, theme, common_chance, rng):
+        return self.table(theme, common_chance).draw(rng)
+
+    def invalidate(self):
+        self.config = None
+        self.tables.clear()
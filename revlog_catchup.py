@@ -0,0 +1,100 @@
+import time
+
+# revlog types that are real answers: learning, review, relearning and
+# filtered; manual reschedules are left out
+ANSWER_TYPES = (0, 1, 2, 3)
+
+
+class RevlogCatchup:
+    # folds reviews that arrived through sync (done on AnkiDroid, AnkiMobile
+    # or the web) through the garden rules in one pass. reviews made on this
+    # device already went through the answer hook, so their ids are noted
+    # before the sync and skipped afterwards. the sync Anki runs on close
+    # comes after the garden is unloaded, so the ids are saved at close
+    # instead and the reviews that sync pulls in are applied at the next open
+    def __init__(self, state, rules, root_deck_id):
+        self.state = state
+        self.rules = rules
+        self.root_deck_id = root_deck_id
+        self.local_ids = None
+
+    def watermark(self):
+        # None as well while no profile is loaded
+        if not self.state.loaded:
+            return None
+        return self.state.user.get("revlogWatermark")
+
+    def set_watermark(self, value):
+        self.state.apply({"type": "set_user", "field": "revlogWatermark", "value": value})
+
+    def start(self, db):
+        # returns True if the watermark was set and needs saving
+        # the first time round only reviews from now on count; revlog ids are
+        # millisecond timestamps, so history arriving later with a full sync
+        # is older than this and stays out
+        if self.watermark() is None:
+            newest = db.scalar("select max(id) from revlog") or 0
+            self.set_watermark(max(newest, int(time.time() * 1000)))
+            return True
+        return False
+
+    def before_sync(self, db):
+        if self.watermark() is None:
+            return
+        self.local_ids = set(db.list("select id from revlog where id > ?", self.watermark()))
+
+    def before_close(self, db):
+        # returns True if ids were saved and need writing
+        if self.watermark() is None:
+            return False
+        self.state.apply({"type": "set_user", "field": "revlogLocalIds",
+                          "value": db.list("select id from revlog where id > ?", self.watermark())})
+        return True
+
+    def after_sync(self, db, settings):
+        # returns (reviews applied, rewards earned)
+        if self.watermark() is None or self.local_ids is None:
+            return 0, []
+        local_ids = self.local_ids
+        self.local_ids = None
+        return self.catch_up(db, settings, local_ids)
+
+    def resume(self, db, settings):
+        # at open, applies what a sync after the last close pulled in;
+        # returns (reviews applied, rewards earned)
+        saved = self.state.user.get("revlogLocalIds")
+        if self.watermark() is None or saved is None:
+            return 0, []
+        self.state.apply({"type": "set_user", "field": "revlogLocalIds", "value": None})
+        return self.catch_up(db, settings, set(saved))
+
+    def catch_up(self, db, settings, local_ids):
+        rows = db.all(
+            "select r.id, r.ease, r.time, coalesce(nullif(c.odid, 0), c.did) from revlog r left join cards c on c.id = r.cid"
+            " where r.id > ? and r.type in (%s) and r.ease > 0 order by r.id"
+            % ",".join(str(t) for t in ANSWER_TYPES),
+            self.watermark(),
+        )
+
+        applied = 0
+        rewards = []
+        newest = self.watermark()
+        selected = self.state.deck
+        for revlog_id, ease, time_ms, did in rows:
+            newest = max(newest, revlog_id)
+            if revlog_id in local_ids:
+                continue
+            # each review grows its root deck's garden; reviews of deleted
+            # cards go to the selected one
+            self.state.switch(self.root_deck_id(did) if did is not None else self.state.follow(selected))
+            # the deck state at the time of the review is unknown, keep ours
+            outcome = self.rules.answer(self.state, settings, ease, time_ms / 1000, self.state.garden["cardsCompleted"])
+            rewards.extend(outcome.rewards)
+            applied += 1
+        # if the selected garden was the legacy one and a synced review's deck
+        # took it over, stay with it rather than start deck 0 afresh
+        self.state.select(self.state.follow(selected))
+        newest = max([newest] + list(local_ids))
+        if newest != self.watermark():
+            self.set_watermark(newest)
+        return applied, rewards
@@ -0,0 +1,97 @@
+import random
+
+SLOT_WIDTH = 80
+ROW_HEIGHT = 40
+
+
+class SpawnGrid:
+    def __init__(self, positions, upper_rows):
+        self.positions = tuple(positions)
+        self.position_set = frozenset(self.positions)
+        self.upper_rows = frozenset(upper_rows)
+
+    def is_upper_row(self, y):
+        return y in self.upper_rows
+
+
+def compile_spawn_grid(gardenPosInfo):
+    if gardenPosInfo["hasMulti"] is True:
+        areas = gardenPosInfo.get("spawnAreas", [])
+    else:
+        areas = [gardenPosInfo.get("spawnArea", [])]
+
+    positions = []
+    upperRow = []
+    for tl, width, height in areas:
+        upperRow.append(tl[1])
+        num_rows = height // ROW_HEIGHT
+        num_cols = width // SLOT_WIDTH
+        for row in range(num_rows):
+            for col in range(num_cols):
+                x = tl[0] + col * SLOT_WIDTH + row%2 * (SLOT_WIDTH // 2) # HCP style offset between rows
+                y = tl[1] + row * ROW_HEIGHT
+                positions.append((x, y))
+    return SpawnGrid(positions, upperRow)
+
+
+class SpawnGridCache:
+    # compiles each theme's slot grid the first time it is asked for and
+    # keeps it until the add-on config changes
+    def __init__(self, load_config):
+        self.load_config = load_config
+        self.gardenPositions = None
+        self.grids = {}
+
+    def positions_config(self):
+        if self.gardenPositions is None:
+            self.gardenPositions = self.load_config()["gardenPositions"]
+        return self.gardenPositions
+
+    def theme_names(self):
+        return list(self.positions_config().keys())
+
+    def grid(self, gardenName):
+        grid = self.grids.get(gardenName)
+        if grid is None:
+            grid = compile_spawn_grid(self.positions_config()[gardenName])
+            self.grids[gardenName] = grid
+        return grid
+
+    def invalidate(self):
+        self.gardenPositions = None
+        self.grids.clear()
+
+
+class FreeSlots:
+    # unoccupied grid positions kept in a list plus an index map, so adding,
+    # removing and drawing a random slot are all O(1)
+    def __init__(self, grid, occupied=()):
+        self.grid = grid
+        occupied = set(occupied)
+        self.slots = [pos for pos in grid.positions if pos not in occupied]
+        self.index = {pos: i for i, pos in enumerate(self.slots)}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, pos):
+        return pos in self.index
+
+    def add(self, pos):
+        # positions left over from a previous theme are not part of this grid
+        if pos in self.index or pos not in self.grid.position_set:
+            return
+        self.index[pos] = len(self.slots)
+        self.slots.append(pos)
+
+    def discard(self, pos):
+        i = self.index.pop(pos, None)
+        if i is None:
+            return
+        last = self.slots.pop()
+        if i < len(self.slots):
+            self.slots[i] = last
+            self.index[last] = i
+
+    def choice(self, rng=random):
+        return self.slots[rng.randrange(len(self.slots))]
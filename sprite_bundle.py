@@ -0,0 +1,136 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+try:
+    from .sprite_catalog import parse_sprite_name
+except ImportError:
+    # run directly as the build script
+    from sprite_catalog import parse_sprite_name
+
+BUNDLE_DIR_NAME = "atlas"
+INDEX_FILE_NAME = "index.json"
+BUNDLE_VERSION = 1
+
+# loose sprite folders that get packed, relative to the add-on folder
+SPRITE_FOLDERS = ("split", "withered")
+
+
+def webp_size(data):
+    # read the canvas size from the RIFF header without decoding the image
+    if len(data) < 30 or data[0:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def bundle_name(folder, name):
+    # one bundle per theme, plus one for the withered sprites and one for
+    # anything that doesn't follow the naming scheme (the sprout)
+    if folder != "split":
+        return folder
+    parsed = parse_sprite_name(name)
+    return parsed[1] if parsed else "misc"
+
+
+def build_bundles(addon_path):
+    out_dir = os.path.join(addon_path, BUNDLE_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+
+    groups = {}
+    for folder in SPRITE_FOLDERS:
+        for name in sorted(os.listdir(os.path.join(addon_path, folder))):
+            if name.endswith(".webp"):
+                groups.setdefault(bundle_name(folder, name), []).append((folder, name))
+
+    index = {"version": BUNDLE_VERSION, "bundles": {}, "sprites": {}}
+    for bundle, sprites in sorted(groups.items()):
+        file_name = f"{bundle}.bin"
+        offset = 0
+        with open(os.path.join(out_dir, file_name), "wb") as out:
+            for folder, name in sprites:
+                with open(os.path.join(addon_path, folder, name), "rb") as f:
+                    data = f.read()
+                width, height = webp_size(data) or (0, 0)
+                out.write(data)
+                index["sprites"][f"{folder}/{name}"] = [file_name, offset, len(data), width, height]
+                offset += len(data)
+        index["bundles"][bundle] = file_name
+
+    with open(os.path.join(out_dir, INDEX_FILE_NAME), "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    return index
+
+
+class SpriteBundles:
+    # serves sprite bytes out of the packed bundles, mapping each bundle file
+    # into memory the first time one of its sprites is needed
+    def __init__(self, bundle_dir, index):
+        self.bundle_dir = bundle_dir
+        self.sprites = index["sprites"]
+        self.maps = {}
+        # sprites are read from decoder threads as well as the main thread
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, addon_path):
+        bundle_dir = os.path.join(addon_path, BUNDLE_DIR_NAME)
+        try:
+            with open(os.path.join(bundle_dir, INDEX_FILE_NAME), "r") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if index.get("version") != BUNDLE_VERSION:
+            return None
+        return cls(bundle_dir, index)
+
+    def names(self, folder):
+        prefix = f"{folder}/"
+        return [key[len(prefix):] for key in self.sprites if key.startswith(prefix)]
+
+    def size(self, relpath):
+        entry = self.sprites.get(relpath)
+        return (entry[3], entry[4]) if entry else None
+
+    def read(self, relpath):
+        entry = self.sprites.get(relpath)
+        if entry is None:
+            return None
+        file_name, offset, length = entry[0], entry[1], entry[2]
+        with self.lock:
+            mapped = self.maps.get(file_name)
+            if mapped is None:
+                try:
+                    with open(os.path.join(self.bundle_dir, file_name), "rb") as f:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    return None
+                self.maps[file_name] = mapped
+            if offset + length > len(mapped):
+                return None
+            return mapped[offset:offset + length]
+
+    def close(self):
+        with self.lock:
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+
+
+if __name__ == "__main__":
+    addon_path = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__))
+    index = build_bundles(addon_path)
+    print(f"packed {len(index['sprites'])} sprites into {len(index['bundles'])} bundles")
@@ -0,0 +1,60 @@
+import os
+import re
+
+SPROUT = "nmk_s000.webp"
+COMMON_SPECIES = "001"
+
+# nmk_s<species>_<theme id>[_<variant>].webp
+SPRITE_NAME_RE = re.compile(r"^nmk_s(\d{3})_(\d{5})(?:_(\d{2}))?\.webp$")
+
+
+def parse_sprite_name(name):
+    match = SPRITE_NAME_RE.match(name)
+    if match is None:
+        return None
+    species, theme, variant = match.groups()
+    return species, theme, variant
+
+
+def theme_id(gardenName):
+    return gardenName.split("_")[0]
+
+
+class SpriteCatalog:
+    # parses the sprite filenames once so lookups by theme, species or
+    # rarity don't have to scan the whole directory listing
+    def __init__(self, names):
+        self.names = list(names)
+        self.info = {}
+        self.by_theme = {}
+        self.by_species = {}
+        self.common = {}
+        self.rare = {}
+        for name in self.names:
+            parsed = parse_sprite_name(name)
+            if parsed is None:
+                continue
+            species, theme, variant = parsed
+            self.info[name] = parsed
+            self.by_theme.setdefault(theme, []).append(name)
+            self.by_species.setdefault(species, []).append(name)
+            tier = self.common if species == COMMON_SPECIES else self.rare
+            tier.setdefault(theme, []).append(name)
+        self.theme_sets = {theme: frozenset(names) for theme, names in self.by_theme.items()}
+
+    @classmethod
+    def from_dir(cls, path):
+        return cls(os.listdir(path))
+
+    def theme_shrooms(self, theme):
+        return self.by_theme.get(theme, [])
+
+    def common_shrooms(self, theme):
+        return self.common.get(theme, [])
+
+    def rare_shrooms(self, theme):
+        return self.rare.get(theme, [])
+
+    def theme_of(self, name):
+        parsed = self.info.get(name)
+        return parsed[1] if parsed else None
@@ -0,0 +1,57 @@
+import json
+import os
+import random
+import sys
+import types
+
+import pytest
+
+# the add-on folder is a package whose __init__ registers Anki hooks; load
+# it as a bare package so the modules that don't need Anki can be imported
+ADDON_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package = types.ModuleType("shroomgarden")
+package.__path__ = [ADDON_PATH]
+sys.modules.setdefault("shroomgarden", package)
+
+from shroomgarden.garden_rules import GardenRules
+from shroomgarden.garden_settings import validate_settings
+from shroomgarden.garden_state import GardenState
+from shroomgarden.spawn_grid import SpawnGridCache
+from shroomgarden.sprite_catalog import SpriteCatalog
+
+
+def read_config():
+    with open(os.path.join(ADDON_PATH, "config.json"), "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    return SpriteCatalog.from_dir(os.path.join(ADDON_PATH, "split"))
+
+
+@pytest.fixture
+def grids():
+    return SpawnGridCache(read_config)
+
+
+@pytest.fixture
+def settings():
+    return validate_settings({})[0]
+
+
+@pytest.fixture
+def make_state(tmp_path):
+    # a GardenState on a database in tmp_path; the JSON files it would
+    # migrate from don't exist
+    def make_state():
+        return GardenState(lambda: str(tmp_path / "shroomgarden.db"),
+                           str(tmp_path / "currentGarden.json"), str(tmp_path / "userData.json"))
+    return make_state
+
+
+@pytest.fixture
+def make_rules(catalog, grids):
+    def make_rules(seed=1):
+        return GardenRules(catalog, grids, rng=random.Random(seed))
+    return make_rules
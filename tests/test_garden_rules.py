@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+from shroomgarden.garden_rules import GardenModel, GardenRules, apply_event, BOOSTER_ANSWERS, SPAWN_CHANCE, WITHER_SECONDS, REWARD_EASE
+from shroomgarden.garden_state import DEFAULT_GARDEN, DEFAULT_USER_DATA, with_defaults
+from shroomgarden.sprite_catalog import SPROUT
+
+THEME = "10002_Grassy_Green.webp"
+
+
+class RecordingModel(GardenModel):
+    def __init__(self, garden, user):
+        super(RecordingModel, self).__init__(garden, user)
+        self.events = []
+
+    def apply(self, event):
+        super(RecordingModel, self).apply(event)
+        self.events.append(event)
+
+
+def make_model(**garden):
+    garden.setdefault("gardenName", THEME)
+    return RecordingModel(with_defaults(garden, DEFAULT_GARDEN), with_defaults({}, DEFAULT_USER_DATA))
+
+
+def grown_garden(grids, catalog, count, stage):
+    positions = grids.grid(THEME).positions[:count]
+    sprite = catalog.theme_shrooms("10002")[0]
+    return {f"{x}_{y}": {"nmk": sprite, "x": x, "y": y, "stage": stage} for x, y in positions}
+
+
+def test_apply_event_runs_a_mushroom_through_its_life():
+    garden = with_defaults({}, DEFAULT_GARDEN)
+    user = with_defaults({}, DEFAULT_USER_DATA)
+    apply_event(garden, user, {"type": "spawn", "slot": "10_20", "x": 10, "y": 20, "upperRow": True})
+    assert garden["gardenNMKs"]["10_20"] == {"nmk": SPROUT, "x": 10, "y": 20, "stage": 0, "upperRow": True}
+    apply_event(garden, user, {"type": "grow", "slot": "10_20", "stage": 1})
+    apply_event(garden, user, {"type": "bloom", "slot": "10_20", "nmk": "nmk_s001_10002_01.webp"})
+    assert garden["gardenNMKs"]["10_20"]["nmk"] == "nmk_s001_10002_01.webp"
+    apply_event(garden, user, {"type": "harvest", "slot": "10_20", "nmk": "nmk_s001_10002_01.webp"})
+    apply_event(garden, user, {"type": "set", "field": "cardCount", "value": 4})
+    assert garden["gardenNMKs"] == {}
+    assert user["collectedMushrooms"] == {"nmk_s001_10002_01.webp": 1}
+    assert garden["cardCount"] == 4
+
+
+def test_apply_event_items():
+    garden = with_defaults({}, DEFAULT_GARDEN)
+    user = with_defaults({}, DEFAULT_USER_DATA)
+    apply_event(garden, user, {"type": "reward", "item": "shield"})
+    apply_event(garden, user, {"type": "reward", "item": "booster"})
+    apply_event(garden, user, {"type": "use_item", "item": "shield"})
+    apply_event(garden, user, {"type": "use_item", "item": "booster"})
+    assert user["inventory"] == {"shield": 0, "booster": 0}
+    assert garden["shield"] == 1
+    assert garden["booster"] == BOOSTER_ANSWERS
+
+
+def test_apply_event_rejects_unknown_events():
+    with pytest.raises(ValueError):
+        apply_event(with_defaults({}, DEFAULT_GARDEN), with_defaults({}, DEFAULT_USER_DATA), {"type": "explode"})
+
+
+def test_same_seed_same_garden(catalog, grids, settings):
+    gardens = []
+    for _ in range(2):
+        rules = GardenRules(catalog, grids, rng=random.Random(7))
+        model = make_model()
+        answers = random.Random(3)
+        for _ in range(300):
+            rules.answer(model, settings, answers.choice((1, 2, 3, 4)), answers.uniform(1, 200), False)
+        gardens.append((model.events, model.garden, model.user))
+    assert gardens[0] == gardens[1]
+    assert any(event["type"] == "bloom" for event in gardens[0][0])
+
+
+def test_first_answer_spawns(make_rules, settings):
+    model = make_model()
+    make_rules().answer(model, settings, 3, 5, False)
+    (nmk_data,) = model.garden["gardenNMKs"].values()
+    assert nmk_data["nmk"] == SPROUT and nmk_data["stage"] == 0
+    assert model.garden["cardCount"] == 1
+
+
+def test_slow_answer_withers_grown_mushrooms(make_rules, catalog, grids, settings):
+    grown = settings["reviewsPerNMK"] - 1
+    model = make_model(gardenNMKs=grown_garden(grids, catalog, 3, grown))
+    make_rules().answer(model, settings, 1, 2 * WITHER_SECONDS + 1, False)
+    withered = [event for event in model.events if event["type"] == "wither"]
+    assert len(withered) == 2
+    for event in withered:
+        assert model.garden["gardenNMKs"][event["slot"]]["stage"] == settings["reviewsPerNMK"]
+
+
+def test_shield_or_a_finished_deck_stops_withering(make_rules, catalog, grids, settings):
+    grown = settings["reviewsPerNMK"] - 1
+    shielded = make_model(gardenNMKs=grown_garden(grids, catalog, 3, grown), shield=1)
+    make_rules().answer(shielded, settings, 1, 2 * WITHER_SECONDS + 1, False)
+    assert shielded.garden["shield"] == 0
+
+    done = make_model(gardenNMKs=grown_garden(grids, catalog, 3, grown), cardsCompleted=True)
+    make_rules().answer(done, settings, 1, 2 * WITHER_SECONDS + 1, True)
+    for model in (shielded, done):
+        assert not any(event["type"] == "wither" for event in model.events)
+
+
+def test_growing_the_last_stage_blooms(catalog, grids, settings):
+    model = make_model(gardenNMKs=grown_garden(grids, catalog, 1, settings["reviewsPerNMK"] - 2))
+    # first draw decides between spawning and growing
+    rng = random.Random()
+    rng.random = iter([SPAWN_CHANCE + 0.1] + [0.0] * 10).__next__
+    GardenRules(catalog, grids, rng=rng).answer(model, settings, 3, 5, False)
+    (nmk_data,) = model.garden["gardenNMKs"].values()
+    assert nmk_data["nmk"] != SPROUT
+    assert catalog.theme_of(nmk_data["nmk"]) == "10002"
+
+
+def test_nothing_left_to_grow_changes_nothing(catalog, grids, settings):
+    model = make_model(gardenNMKs=grown_garden(grids, catalog, 3, settings["reviewsPerNMK"] - 1))
+    # grow rather than spawn
+    rng = random.Random()
+    rng.random = lambda: SPAWN_CHANCE
+    outcome = GardenRules(catalog, grids, rng=rng).answer(model, settings, 3, 5, False)
+    assert outcome.garden_full
+    assert model.events == []
+
+
+def test_garden_shows_every_interval(make_rules, settings):
+    model = make_model(cardCount=settings["gardenShowInterval"] - 1)
+    assert not make_rules().answer(model, settings, 3, 5, False).show_garden
+    assert make_rules().answer(model, settings, 3, 5, False).show_garden
+    assert model.garden["cardCount"] == 0
+
+
+def test_reward_after_threshold(make_rules, settings):
+    model = make_model(easyCount=settings["rewardsThreshold"] - 1)
+    outcome = make_rules().answer(model, settings, REWARD_EASE, 5, False)
+    (item,) = outcome.rewards
+    assert model.user["inventory"][item] == 1
+    assert model.garden["easyCount"] == 0
+
+
+def test_free_slots_follow_spawns_and_harvests(make_rules, catalog, grids, settings):
+    grid = grids.grid(THEME)
+    nmks = grown_garden(grids, catalog, 2, settings["reviewsPerNMK"] - 1)
+    model = make_model(gardenNMKs=dict(nmks))
+    rules = make_rules()
+    free = model.free_slots_for(grid)
+    assert len(free) == len(grid.positions) - 2
+    coordsStr = rules.spawn(model)
+    assert len(free) == len(grid.positions) - 3
+    # the sprout stays
+    assert rules.harvest_many(model, list(model.garden["gardenNMKs"])) == list(nmks)
+    assert list(model.garden["gardenNMKs"]) == [coordsStr]
+    assert len(free) == len(grid.positions) - 1
+    assert model.collection_for(catalog).collected_count("10002") == 1
+
+
+def test_use_item_needs_one_in_the_inventory(make_rules):
+    model = make_model()
+    rules = make_rules()
+    assert not rules.use_item(model, "booster")
+    model.apply({"type": "reward", "item": "booster"})
+    assert rules.use_item(model, "booster")
+    assert model.garden["booster"] == BOOSTER_ANSWERS
@@ -0,0 +1,171 @@
+import json
+import os
+
+from shroomgarden.garden_state import FLUSH_EVERY_N_ANSWERS
+from shroomgarden.garden_store import LEGACY_DECK
+from shroomgarden.sprite_catalog import SPROUT
+
+THEME = "10002_Grassy_Green.webp"
+
+
+def grow_some(state, rules, settings, answers=40):
+    for _ in range(answers):
+        rules.answer(state, settings, 3, 5, False)
+    return json.loads(json.dumps((state.garden, state.user)))
+
+
+def test_flush_round_trip(make_state, make_rules, settings):
+    state = make_state()
+    state.load()
+    state.select(1)
+    expected = grow_some(state, make_rules(), settings)
+    state.mark_dirty()
+    state.unload()
+
+    state = make_state()
+    state.load()
+    assert state.deck == 1
+    assert (state.garden, state.user) == tuple(expected)
+
+
+def test_crash_before_flush_replays_the_journal(make_state, make_rules, settings):
+    state = make_state()
+    state.load()
+    state.select(1)
+    expected = grow_some(state, make_rules(), settings)
+    state.mark_dirty()
+    # no flush: the process dies with the events only in the journal
+    state.close()
+
+    state = make_state()
+    state.load()
+    assert (state.garden, state.user) == tuple(expected)
+    assert not state.dirty
+    # replayed events went into a snapshot, so the journal is empty again
+    assert state.journal.read() == []
+
+
+def test_unjournaled_events_are_lost_in_a_crash(make_state, make_rules, settings):
+    state = make_state()
+    state.load()
+    state.select(1)
+    expected = grow_some(state, make_rules(), settings)
+    state.mark_dirty()
+    grow_some(state, make_rules(), settings, answers=5)
+    state.close()
+
+    state = make_state()
+    state.load()
+    assert (state.garden, state.user) == tuple(expected)
+
+
+def test_torn_last_line_is_dropped(make_state, make_rules, settings, tmp_path):
+    state = make_state()
+    state.load()
+    state.select(1)
+    expected = grow_some(state, make_rules(), settings)
+    state.mark_dirty()
+    state.close()
+    with open(tmp_path / "shroomgarden.events", "a") as f:
+        f.write('[999999,0,1,{"type":"set","fie')
+
+    state = make_state()
+    state.load()
+    assert (state.garden, state.user) == tuple(expected)
+
+
+def test_events_already_in_the_snapshot_are_not_replayed(make_state, make_rules, settings, tmp_path):
+    state = make_state()
+    state.load()
+    state.select(1)
+    grow_some(state, make_rules(), settings)
+    state.mark_dirty()
+    with open(tmp_path / "shroomgarden.events") as f:
+        journal = f.read()
+    state.flush()
+    expected = json.loads(json.dumps((state.garden, state.user)))
+    # a crash between writing the snapshot and emptying the journal
+    state.close()
+    with open(tmp_path / "shroomgarden.events", "w") as f:
+        f.write(journal)
+
+    state = make_state()
+    state.load()
+    assert (state.garden, state.user) == tuple(expected)
+
+
+def test_answers_ask_for_a_flush_every_n(make_state, make_rules, settings):
+    state = make_state()
+    state.load()
+    rules = make_rules()
+    for i in range(FLUSH_EVERY_N_ANSWERS):
+        rules.answer(state, settings, 3, 5, False)
+        assert state.mark_dirty(answered=True) == (i == FLUSH_EVERY_N_ANSWERS - 1)
+    state.flush()
+    assert not state.dirty and state.answers_since_flush == 0
+
+
+def test_each_root_deck_has_its_own_garden(make_state, make_rules, settings):
+    state = make_state()
+    state.load()
+    state.select(1)
+    first = grow_some(state, make_rules(), settings)[0]
+    state.select(2)
+    assert state.garden["gardenNMKs"] == {}
+    state.apply({"type": "set", "field": "gardenName", "value": THEME})
+    state.mark_dirty()
+    state.unload()
+
+    state = make_state()
+    state.load()
+    assert state.deck == 2 and state.garden["gardenName"] == THEME
+    state.switch(1)
+    assert state.garden == first
+
+
+def test_first_deck_claims_the_migrated_garden(make_state, tmp_path):
+    nmks = {"10_20": {"nmk": SPROUT, "x": 10, "y": 20, "stage": 1}}
+    with open(tmp_path / "currentGarden.json", "w") as f:
+        json.dump({"gardenName": THEME, "gardenNMKs": nmks, "cardCount": 7}, f)
+    with open(tmp_path / "userData.json", "w") as f:
+        json.dump({"collectedMushrooms": {"nmk_s001_10002_01.webp": 2}, "inventory": {"shield": 1}}, f)
+
+    state = make_state()
+    state.load()
+    assert state.deck == LEGACY_DECK
+    assert state.user["collectedMushrooms"] == {"nmk_s001_10002_01.webp": 2}
+    state.select(42)
+    assert state.garden["gardenNMKs"] == nmks and state.garden["cardCount"] == 7
+    assert state.follow(LEGACY_DECK) == 42
+    # later decks start empty
+    state.select(43)
+    assert state.garden["gardenNMKs"] == {}
+    state.select(42)
+    state.mark_dirty()
+    state.unload()
+
+    state = make_state()
+    state.load()
+    assert state.deck == 42 and state.garden["gardenNMKs"] == nmks
+    assert not state.store.has_shard(LEGACY_DECK)
+    # the JSON files are only read once
+    os.remove(tmp_path / "currentGarden.json")
+    state.unload()
+    state.load()
+    assert state.garden["cardCount"] == 7
+
+
+def test_peek_shows_the_garden_a_deck_would_get(make_state, tmp_path):
+    with open(tmp_path / "currentGarden.json", "w") as f:
+        json.dump({"gardenName": THEME}, f)
+    state = make_state()
+    state.load()
+    # the first deck would take over the migrated garden
+    assert state.peek(42)["gardenName"] == THEME
+    assert state.deck == LEGACY_DECK
+    state.select(42)
+    state.apply({"type": "set", "field": "cardCount", "value": 3})
+    state.select(43)
+    assert state.peek(42)["cardCount"] == 3
+    assert state.peek(44) is None
+    assert state.deck == 43
@@ -0,0 +1,94 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from shroomgarden.rarity_sampler import AliasTable, RaritySampler, validate_rarity_config, DEFAULT_RARITY_CONFIG
+from shroomgarden.sprite_catalog import COMMON_SPECIES
+
+DRAWS = 100000
+
+
+def frequencies(draw, draws=DRAWS):
+    rng = random.Random(0)
+    counts = Counter(draw(rng) for _ in range(draws))
+    return {item: count / draws for item, count in counts.items()}
+
+
+def test_alias_table_follows_the_weights():
+    weights = {"a": 1, "b": 2, "c": 7, "d": 0}
+    table = AliasTable(list(weights), list(weights.values()))
+    seen = frequencies(table.draw)
+    assert "d" not in seen
+    for item, weight in weights.items():
+        assert seen.get(item, 0) == pytest.approx(weight / 10, abs=0.01)
+
+
+def test_alias_table_single_item():
+    table = AliasTable(["only"], [0.5])
+    assert frequencies(table.draw, 100) == {"only": 1.0}
+
+
+@pytest.mark.parametrize("weights", [[], [0, 0]])
+def test_alias_table_needs_a_positive_weight(weights):
+    with pytest.raises(ValueError):
+        AliasTable(["x"] * len(weights), weights)
+
+
+def test_validate_keeps_a_good_config():
+    data = {"tiers": {"common": ["001"], "superRare": ["050"]}, "tierWeights": {"rare": 0.9, "superRare": 1}, "speciesWeights": {"002": 0}}
+    config, problems = validate_rarity_config(data)
+    assert problems == []
+    assert config == {"tiers": data["tiers"], "tierWeights": {"rare": 0.9, "superRare": 1.0}, "speciesWeights": {"002": 0.0}}
+
+
+@pytest.mark.parametrize("weight", [-1, math.nan, math.inf, True, "2", None])
+def test_validate_drops_bad_weights(weight):
+    config, problems = validate_rarity_config({"tierWeights": {"rare": weight, "other": 2}, "speciesWeights": {"003": weight}})
+    assert config["tierWeights"] == {"other": 2.0}
+    assert config["speciesWeights"] == {}
+    assert len(problems) == 2
+
+
+def test_validate_drops_bad_tiers():
+    config, problems = validate_rarity_config({"tiers": {"common": ["001"], "broken": "050", "mixed": ["050", 51]}})
+    assert config["tiers"] == {"common": ["001"]}
+    assert len(problems) == 2
+
+
+@pytest.mark.parametrize("data", [[], "rare", 3])
+def test_validate_falls_back_for_a_non_object(data):
+    config, problems = validate_rarity_config(data)
+    assert config == DEFAULT_RARITY_CONFIG
+    assert problems
+
+
+def test_missing_section_uses_the_defaults():
+    assert validate_rarity_config(None) == (DEFAULT_RARITY_CONFIG, [])
+
+
+def test_common_tier_gets_the_common_chance(catalog):
+    sampler = RaritySampler(catalog)
+    seen = frequencies(lambda rng: sampler.draw("10002", 0.7, rng))
+    common = sum(share for name, share in seen.items() if catalog.info[name][0] == COMMON_SPECIES)
+    assert common == pytest.approx(0.7, abs=0.01)
+    assert set(seen) == set(catalog.theme_shrooms("10002"))
+
+
+def test_tiers_share_the_rest_by_weight(catalog):
+    species = sorted({catalog.info[name][0] for name in catalog.theme_shrooms("10002")} - {COMMON_SPECIES})
+    config = {"tiers": {"common": [COMMON_SPECIES], "superRare": species[:1]}, "tierWeights": {"rare": 3, "superRare": 1}}
+    sampler = RaritySampler(catalog, lambda: config)
+    seen = frequencies(lambda rng: sampler.draw("10002", 0.6, rng))
+    super_rare = sum(share for name, share in seen.items() if catalog.info[name][0] == species[0])
+    assert super_rare == pytest.approx(0.4 * 0.25, abs=0.01)
+    assert sampler.tiers() == ["common", "rare", "superRare"]
+
+
+def test_all_zero_weights_fall_back_to_the_default_split(catalog):
+    species = {catalog.info[name][0] for name in catalog.info}
+    sampler = RaritySampler(catalog, lambda: {"speciesWeights": {s: 0 for s in species}})
+    name = sampler.draw("10002", 0.7, random.Random(0))
+    assert name in catalog.theme_shrooms("10002")
+    assert sampler.problems
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from shroomgarden.revlog_catchup import RevlogCatchup
+
+
+class RevlogDb:
+    # the parts of Anki's DBProxy the catch-up uses, over a bare revlog and
+    # cards table
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("create table revlog (id integer primary key, cid integer, ease integer, time integer, type integer)")
+        self.db.execute("create table cards (id integer primary key, did integer, odid integer)")
+
+    def scalar(self, sql, *args):
+        row = self.db.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def list(self, sql, *args):
+        return [row[0] for row in self.db.execute(sql, args)]
+
+    def all(self, sql, *args):
+        return self.db.execute(sql, args).fetchall()
+
+    def review(self, revlog_id, did, ease=3):
+        self.db.execute("insert or ignore into cards (id, did, odid) values (?, ?, 0)", (revlog_id, did))
+        self.db.execute("insert into revlog (id, cid, ease, time, type) values (?, ?, ?, 5000, 1)", (revlog_id, revlog_id, ease))
+
+
+@pytest.fixture
+def revlog():
+    return RevlogDb()
+
+
+def open_profile(make_state, make_rules, revlog, settings):
+    state = make_state()
+    state.load()
+    catchup = RevlogCatchup(state, make_rules(), lambda did: did)
+    catchup.start(revlog)
+    return state, catchup, catchup.resume(revlog, settings)
+
+
+def test_sync_applies_only_remote_reviews(make_state, make_rules, revlog, settings):
+    state, catchup, _ = open_profile(make_state, make_rules, revlog, settings)
+    start = catchup.watermark()
+    revlog.review(start + 10, did=1)
+    catchup.before_sync(revlog)
+    revlog.review(start + 5, did=1)
+    revlog.review(start + 20, did=1)
+    assert catchup.after_sync(revlog, settings) == (2, [])
+    assert catchup.watermark() == start + 20
+    assert state.garden["cardCount"] == 2
+
+
+def test_reviews_synced_on_close_are_applied_at_next_open(make_state, make_rules, revlog, settings):
+    state, catchup, _ = open_profile(make_state, make_rules, revlog, settings)
+    start = catchup.watermark()
+    # answered here, so already in the garden
+    revlog.review(start + 10, did=1)
+    assert catchup.before_close(revlog)
+    state.mark_dirty()
+    state.unload()
+
+    # the sync on close pulls in a review made earlier on another device
+    revlog.review(start + 5, did=1)
+
+    state, catchup, (applied, rewards) = open_profile(make_state, make_rules, revlog, settings)
+    assert applied == 1
+    assert catchup.watermark() == start + 10
+    assert state.user["revlogLocalIds"] is None
+    assert state.deck == 1
+    # the sync on open has nothing left to apply
+    catchup.before_sync(revlog)
+    assert catchup.after_sync(revlog, settings) == (0, [])
+
+
+def test_close_without_sync_applies_nothing(make_state, make_rules, revlog, settings):
+    state, catchup, _ = open_profile(make_state, make_rules, revlog, settings)
+    start = catchup.watermark()
+    revlog.review(start + 10, did=1)
+    catchup.before_close(revlog)
+    state.mark_dirty()
+    state.unload()
+
+    state, catchup, resumed = open_profile(make_state, make_rules, revlog, settings)
+    assert resumed == (0, [])
+    assert catchup.watermark() == start + 10
+
+
+def test_nothing_to_do_while_unloaded(make_state, make_rules, revlog, settings):
+    state = make_state()
+    catchup = RevlogCatchup(state, make_rules(), lambda did: did)
+    assert catchup.watermark() is None
+    assert not catchup.before_close(revlog)
+    catchup.before_sync(revlog)
+    assert catchup.after_sync(revlog, settings) == (0, [])